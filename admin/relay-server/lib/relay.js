@@ -26,6 +26,8 @@ export class RealtimeRelay {
     this.table = []
     this.processedFeedback = ""
     this.processed_ideas = []
+    this.processedIdeasSeq = -1
+    this.researchProgress = {}
   }
 
   listen(port) {
@@ -71,9 +73,28 @@ export class RealtimeRelay {
       console.log('Received POST request to /processed_ideas');
       console.log('Request body:', req.body);
       this.processed_ideas = req.body.processed_ideas;
+      this.processedIdeasSeq = this.processed_ideas.length - 1;
       res.status(200).json({ message: 'Processed ideas received' });
     });
 
+    // Append-only delta sync: only ideas after since_seq are sent
+    this.app.post('/processed_ideas/append', (req, res) => {
+      const { since_seq, processed_ideas } = req.body;
+      console.log(`Received POST request to /processed_ideas/append (since_seq=${since_seq}, count=${processed_ideas.length})`);
+      if (since_seq > this.processedIdeasSeq) {
+        // We missed updates (e.g. relay restarted); ask the sender to resend
+        res.status(409).json({ ack_seq: this.processedIdeasSeq });
+        return;
+      }
+      processed_ideas.forEach(idea => {
+        if (idea.seq > this.processedIdeasSeq) {
+          this.processed_ideas.push(idea);
+          this.processedIdeasSeq = idea.seq;
+        }
+      });
+      res.status(200).json({ ack_seq: this.processedIdeasSeq });
+    });
+
     this.app.post('/idea', (req, res) => {
       console.log('Received POST request to /idea');
       console.log('Request body:', req.body);
@@ -88,6 +109,21 @@ export class RealtimeRelay {
       res.status(200).json({ message: 'Idea(s) received' });
     });
 
+    // Partial research streamed by the researcher, keyed by idea
+    this.app.post('/research_progress', (req, res) => {
+      const { idea, research, compound_score, done } = req.body;
+      if (!idea) {
+        res.status(400).json({ message: 'Missing idea' });
+        return;
+      }
+      this.researchProgress[idea] = { idea, research, compound_score, done };
+      res.status(200).json({ message: 'Progress received' });
+    });
+
+    this.app.get('/research_progress', (req, res) => {
+      res.json(Object.values(this.researchProgress));
+    });
+
     // raw_feedback
     this.app.post('/raw_feedback', (req, res) => {
       console.log('Received POST request to /raw_feedback');
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+import aiohttp
+
+
+class ProcessedIdeasSync:
+    """
+    Incrementally syncs processed ideas to the admin relay.
+
+    The sequence number of a processed idea is its index in the searcher's
+    processed_ideas list. Only ideas after the last sequence acknowledged by
+    the relay are sent, over one long-lived session, and updates are coalesced
+    until either flush_interval seconds pass or flush_size new ideas pile up.
+    """
+
+    def __init__(
+        self,
+        processed_ideas: List[Tuple[Any, dict]],
+        endpoint_url: str = "http://localhost:9000/processed_ideas/append",
+        flush_interval: float = 2.0,
+        flush_size: int = 20,
+        max_ideas_per_request: int = 200,
+    ):
+        self.processed_ideas = processed_ideas
+        self.endpoint_url = endpoint_url
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_ideas_per_request = max_ideas_per_request
+        self.acked_seq = -1  # Last sequence number acknowledged by the relay
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.flush_requested = asyncio.Event()
+
+    def pending_count(self) -> int:
+        return max(0, len(self.processed_ideas) - (self.acked_seq + 1))
+
+    def notify(self):
+        """
+        Signals that new ideas were appended; flushes early once flush_size is reached.
+        """
+        if self.pending_count() >= self.flush_size:
+            self.flush_requested.set()
+
+    async def run(self):
+        self.session = aiohttp.ClientSession()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self.flush_requested.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.flush_requested.clear()
+                await self.flush()
+        finally:
+            await self.close()
+
+    async def flush(self):
+        """
+        Sends pending ideas until the relay has them all. Stops early, until the
+        next interval, whenever the relay's acknowledgement does not move forward.
+        """
+        while self.pending_count() > 0:
+            start = self.acked_seq + 1
+            batch = self.processed_ideas[start:start + self.max_ideas_per_request]
+            last_sent = start + len(batch) - 1
+            payload = {
+                "since_seq": self.acked_seq,
+                "processed_ideas": [
+                    processed_idea_to_json(seq, idea, scores)
+                    for seq, (idea, scores) in enumerate(batch, start=start)
+                ],
+            }
+            try:
+                async with self.session.post(self.endpoint_url, json=payload) as response:
+                    body = await response.json(content_type=None)
+                    if response.status not in (200, 409):
+                        print(f"Failed to sync processed ideas. Status code: {response.status}")
+                        return
+                    previous, ack_seq = self.acked_seq, int(body["ack_seq"])
+                    self.acked_seq = self._clamp_ack(ack_seq)
+                    if response.status == 409:
+                        # The relay lost or skipped updates; resend from its position
+                        print(f"Admin relay is at seq {ack_seq}, resending from there.")
+                        if self.acked_seq >= previous:
+                            return  # Not behind us after all; try again next interval
+                        continue
+                    if self.acked_seq < last_sent:
+                        print(f"Admin relay only acknowledged up to seq {ack_seq}; retrying next interval.")
+                        return
+                    print(f"Synced processed ideas to the admin up to seq {self.acked_seq}.")
+            except (aiohttp.ClientError, ValueError, KeyError) as e:
+                print(f"Error syncing processed ideas: {e}")
+                return
+
+    def _clamp_ack(self, ack_seq: int) -> int:
+        # A relay ahead of us (e.g. kept state across our restart) has nothing to gain from a resend
+        last_seq = len(self.processed_ideas) - 1
+        if ack_seq > last_seq:
+            print(f"Admin relay acknowledged seq {ack_seq} but only {last_seq} exists; treating everything as synced.")
+            return last_seq
+        return ack_seq
+
+    async def close(self):
+        if self.session is not None:
+            await self.flush()
+            await self.session.close()
+            self.session = None
+
+
+def processed_idea_to_json(seq: int, idea, scores: dict) -> dict:
+    return {
+        "seq": seq,
+        "idea_description": idea.idea_description,
+        "requirements": idea.requirements,
+        "search_score": scores['search_score'],
+        "viability_score": scores['viability_score'],
+        "criteria_version": scores.get('criteria_version')
+    }
@@ -0,0 +1,208 @@
+import asyncio
+import json
+from typing import List
+
+from llm_client import llm_client
+from prompts import prompt_messages
+
+# Scores a whole list of ideas in one call; ideas are referred to by their index in the prompt
+idea_batch_evaluation_tool = [
+    {
+        "type": "function",
+        "function": {
+            "name": "evaluate_ideas_batch",
+            "description": "Evaluate each of the numbered business ideas against the search criteria, its viability and any additional criteria.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "evaluations": {
+                        "type": "array",
+                        "description": "Exactly one evaluation per numbered idea.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "idea_index": {
+                                    "type": "integer",
+                                    "description": "The number of the idea being evaluated."
+                                },
+                                "search_score": {
+                                    "type": "number",
+                                    "description": "A score from 1 to 5 indicating how well the idea matches the search criteria."
+                                },
+                                "viability_score": {
+                                    "type": "number",
+                                    "description": "A score from 1 to 5 indicating the idea's potential for success, scalability, and profitability."
+                                },
+                                "additional_scores": {
+                                    "type": "array",
+                                    "description": "One score per additional criterion, in the order given.",
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "criterion": {"type": "string"},
+                                            "score": {"type": "number"}
+                                        },
+                                        "required": ["criterion", "score"],
+                                        "additionalProperties": False
+                                    }
+                                }
+                            },
+                            "required": ["idea_index", "search_score", "viability_score", "additional_scores"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["evaluations"],
+                "additionalProperties": False
+            }
+        }
+    }
+]
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token), good enough for budgeting batches
+    return len(text) // 4 + 1
+
+
+class BatchEvaluator:
+    """
+    Scores many ideas per request using the searcher's criteria and prompts.
+
+    evaluate() is meant for concurrent callers such as the searcher's workers:
+    requests arriving within max_wait seconds of each other are coalesced into
+    one batch. evaluate_many() scores a known list, e.g. the whole frontier.
+    Batches are chunked by an approximate token budget, and a malformed
+    response is retried by splitting the batch in half until single ideas fall
+    back to the per-idea combined evaluation.
+    """
+
+    def __init__(self, searcher, max_batch_tokens: int = 4000, max_batch_size: int = 10,
+                 max_wait: float = 0.05, max_concurrent_batches: int = 4):
+        self.searcher = searcher
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.semaphore = asyncio.Semaphore(max_concurrent_batches)
+        self.pending = []  # (idea, future) pairs waiting for the next flush
+        self.flush_task = None
+        self.resolve_tasks = set()  # Batches being evaluated, referenced until done so they are not collected
+
+    async def evaluate(self, idea) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((idea, future))
+        if len(self.pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def evaluate_many(self, ideas: List) -> List[dict]:
+        chunks = self.chunk(ideas)
+        results = await asyncio.gather(*(self._evaluate_chunk(chunk) for chunk in chunks))
+        return [scores for chunk_scores in results for scores in chunk_scores]
+
+    def chunk(self, ideas: List) -> List[List]:
+        chunks, current, current_tokens = [], [], 0
+        for idea in ideas:
+            tokens = estimate_tokens(idea.idea_description) + estimate_tokens(idea.requirements)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(idea)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_wait)
+        self.flush_task = None
+        self._flush_now()
+
+    def _flush_now(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._resolve(batch))
+            self.resolve_tasks.add(task)
+            task.add_done_callback(self._resolved)
+
+    def _resolved(self, task: asyncio.Task):
+        self.resolve_tasks.discard(task)
+        # _resolve hands evaluation errors to the waiting callers; anything else would otherwise go unseen
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error resolving an evaluation batch: {task.exception()!r}")
+
+    async def _resolve(self, batch):
+        ideas = [idea for idea, _ in batch]
+        try:
+            results = await self.evaluate_many(ideas)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), scores in zip(batch, results):
+            if not future.done():
+                future.set_result(scores)
+
+    async def _evaluate_chunk(self, ideas: List) -> List[dict]:
+        if len(ideas) == 1:
+            return [await self.searcher.evaluate_combined_heuristics(ideas[0])]
+        try:
+            async with self.semaphore:
+                return await self._request_batch(ideas)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"Malformed batch evaluation for {len(ideas)} ideas ({e!r}), splitting and retrying")
+            middle = len(ideas) // 2
+            first, second = await asyncio.gather(
+                self._evaluate_chunk(ideas[:middle]),
+                self._evaluate_chunk(ideas[middle:])
+            )
+            return first + second
+
+    async def _request_batch(self, ideas: List) -> List[dict]:
+        searcher = self.searcher
+        free_text_criteria = searcher.acceptance_criteria.get('free_text', '')
+        additional_criteria = searcher.acceptance_criteria.get('additional_criteria', [])
+        numbered_ideas = "\n\n".join(
+            f"Idea {index}: {idea.idea_description}\nIdea {index} Requirements: {idea.requirements}"
+            for index, idea in enumerate(ideas, start=1)
+        )
+
+        return await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="evaluate",
+            site="batch_heuristic",
+            # Parsed before caching, so a batch that fails to parse is split rather than replayed
+            parse=lambda response: self._parse_batch(response, len(ideas)),
+            messages=prompt_messages(
+                "batch_heuristic",
+                search_criteria=searcher.search_criteria,
+                free_text=free_text_criteria,
+                additional_criteria=json.dumps(additional_criteria),
+                numbered_ideas=numbered_ideas,
+            ),
+            tools=idea_batch_evaluation_tool,
+            tool_choice={"type": "function", "function": {"name": "evaluate_ideas_batch"}}
+        )
+
+    @staticmethod
+    def _parse_batch(oai_call, count: int) -> List[dict]:
+        evaluations = json.loads(oai_call.choices[0].message.tool_calls[0].function.arguments)['evaluations']
+
+        by_index = {evaluation['idea_index']: evaluation for evaluation in evaluations}
+        if sorted(by_index) != list(range(1, count + 1)):
+            raise ValueError(f"expected evaluations for ideas 1..{count}, got {sorted(by_index)}")
+
+        results = []
+        for index in range(1, count + 1):
+            evaluation = by_index[index]
+            scores = {'search_score': float(evaluation['search_score']), 'viability_score': float(evaluation['viability_score'])}
+            if evaluation['additional_scores']:
+                scores['additional_scores'] = {item['criterion']: item['score'] for item in evaluation['additional_scores']}
+            results.append(scores)
+        return results
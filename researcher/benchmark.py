@@ -0,0 +1,200 @@
+"""
+Offline throughput benchmark for the searcher and researcher.
+
+Runs the whole pipeline for a fixed time against the mock LLM backend
+(mock_llm.py), either in-process or over HTTP, and reports ideas processed
+per second, LLM calls and tokens per researched idea, batching and cache
+behaviour, and peak memory. It then measures how many comparisons each
+ranking strategy needs as the number of ranked ideas grows.
+
+    python benchmark.py --duration 30 --latency 0.05 --json results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from aiohttp import web
+from openai import AsyncOpenAI
+
+from llm_cache import LLMCache
+from llm_client import llm_client
+from metrics import metrics
+from mock_llm import MOCK_PERSONAS, MockAsyncOpenAI, MockLLM, make_mock_app
+from persona_sampler import PersonaSampler
+from prompts import cached_token_report
+from ranking import RANKING_ENGINES, make_ranking_engine
+from rate_limiter import RateLimiter, TokenBudget
+import idea_searcher
+
+SEARCH_CRITERIA = "Business ideas that use real-time AI voice technology to address an urgent real-world need."
+
+
+async def run_pipeline(args) -> dict:
+    mock = MockLLM(latency=args.latency, rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                   cache_min_tokens=args.cache_min_tokens, seed=args.seed)
+    runner = web.AppRunner(make_mock_app(mock))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    if args.http:
+        llm_client.set_backend(AsyncOpenAI(base_url=f"{base_url}/v1", api_key="mock", max_retries=0))
+    else:
+        llm_client.set_backend(MockAsyncOpenAI(mock))
+    # Limits high enough that the benchmark measures the code, not the limiter
+    llm_client.rate_limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    llm_client.budget = TokenBudget()
+    llm_client.cache = LLMCache()
+
+    # Admin approval is a placeholder that sleeps for a second, so keep ideas above its threshold by default
+    acceptance_criteria = {"threshold": args.threshold, "free_text": "The idea should address a clear market need."}
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        searcher = idea_searcher.IdeaSearcher(SEARCH_CRITERIA, acceptance_criteria, idea_searcher.shared_state,
+                                              checkpoint_dir=checkpoint_dir)
+        searcher.metrics_snapshot_path = None
+        searcher.control_plane_port = None
+        researcher = searcher.idea_researcher
+        searcher.persona_sampler = PersonaSampler.from_personas(MOCK_PERSONAS)
+        searcher.admin_sync.endpoint_url = f"{base_url}/processed_ideas/append"
+        researcher.endpoint_url = f"{base_url}/idea"
+        researcher.progress_url = f"{base_url}/research_progress"
+        await searcher.admit_ideas([idea_searcher.Idea("An AI voice receptionist for small clinics", SEARCH_CRITERIA)], 4)
+
+        if args.trace_memory:
+            tracemalloc.start()
+        log = io.StringIO() if args.verbose else open("/dev/null", "w")
+        started = time.monotonic()
+        with contextlib.redirect_stdout(log):
+            search_task = asyncio.create_task(searcher.search())
+            await asyncio.sleep(args.duration)
+            search_task.cancel()
+            try:
+                await search_task
+            except asyncio.CancelledError:
+                pass
+            await asyncio.sleep(0.5)  # Let cancelled background tasks (admin sync, checkpoints) finish
+        elapsed = time.monotonic() - started
+        if args.verbose:
+            sys.stderr.write(log.getvalue())
+        log.close()
+        python_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        tracemalloc.stop()
+
+    await runner.cleanup()
+
+    mock_stats = mock.stats()
+    processed = len(searcher.processed_ideas)
+    researched = len(researcher.researched_ideas)
+    total_tokens = mock_stats["prompt_tokens"] + mock_stats["completion_tokens"]
+    batched = sum(size * count for size, count in mock.batch_sizes.items())
+    batches = sum(mock.batch_sizes.values())
+    histograms = metrics.snapshot()["histograms"]
+    return {
+        "duration_s": elapsed,
+        "ideas_processed": processed,
+        "ideas_processed_per_s": processed / elapsed,
+        "ideas_researched": researched,
+        "ideas_researched_per_s": researched / elapsed,
+        "llm_calls": mock_stats["total_calls"],
+        "llm_calls_per_researched_idea": mock_stats["total_calls"] / researched if researched else None,
+        "tokens": total_tokens,
+        "tokens_per_researched_idea": total_tokens / researched if researched else None,
+        "cached_prompt_token_ratio": mock_stats["cached_tokens"] / mock_stats["prompt_tokens"] if mock_stats["prompt_tokens"] else None,
+        "cached_token_ratio_by_template": {name: round(report["cached_ratio"], 3) for name, report in cached_token_report().items()},
+        "calls_by_kind": mock_stats["calls"],
+        "failures": mock_stats["failures"],
+        "mean_evaluation_batch_size": batched / batches if batches else None,
+        "llm_latency_p95_s": {series: histogram["p95"] for series, histogram in histograms.items()
+                              if series.startswith("llm_request_seconds")},
+        "stage_latency_p95_s": {series: histogram["p95"] for series, histogram in histograms.items()
+                                if series.startswith("stage_seconds")},
+        "ranking_comparisons": researcher.researched_ranker.comparison_count,
+        "ranking_calls": researcher.researched_ranker.call_count,
+        "ranking_confidence": researcher.researched_ranker.confidence(),
+        "frontier_size": len(searcher.frontier),
+        "frontier_evicted": searcher.frontier.evicted,
+        "duplicates_rejected": searcher.dedup_index.rejected,
+        "cache": llm_client.cache.stats(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_python_heap_mb": python_peak / 2**20 if python_peak is not None else None,
+    }
+
+
+async def run_ranking_cost(sizes, seed: int) -> dict:
+    """
+    LLM calls, pairwise comparisons and wall time each ranking strategy needs
+    to rank n ideas, with a consistent zero-latency judge.
+    """
+    results = {}
+    for strategy in RANKING_ENGINES:
+        results[strategy] = {}
+        for n in sizes:
+            rng = random.Random(seed)
+            quality = {f"idea {i}": rng.random() for i in range(n)}
+
+            async def compare(a, b):
+                return 1.0 if quality[a] > quality[b] else 0.0
+
+            async def rank_window(keys):
+                return sorted(keys, key=quality.get, reverse=True)
+
+            options = {"listwise": {"rank_window": rank_window}}
+            engine = make_ranking_engine(strategy, compare, {}, **options.get(strategy, {}))
+            started = time.perf_counter()
+            for key in quality:
+                await engine.insert(key)
+            results[strategy][n] = {
+                "calls": engine.call_count,
+                "comparisons": engine.comparison_count,
+                "comparisons_per_idea": engine.comparison_count / n,
+                "seconds": time.perf_counter() - started,
+            }
+    return results
+
+
+def print_report(pipeline: dict, ranking: dict):
+    print("Pipeline")
+    for key, value in pipeline.items():
+        print(f"  {key:32} {value:.3f}" if isinstance(value, float) else f"  {key:32} {value}")
+    print("\nRanking cost (LLM calls to rank n ideas)")
+    sizes = list(next(iter(ranking.values())))
+    print("  " + f"{'strategy':18}" + "".join(f"{f'n={n}':>10}" for n in sizes))
+    for strategy, by_size in ranking.items():
+        print("  " + f"{strategy:18}" + "".join(f"{by_size[n]['calls']:>10}" for n in sizes))
+
+
+async def main(args):
+    pipeline = await run_pipeline(args)
+    ranking = await run_ranking_cost(args.ranking_sizes, args.seed or 0)
+    print_report(pipeline, ranking)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"pipeline": pipeline, "ranking": ranking}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the pipeline for")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median mock LLM latency in seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of mock requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock requests answered with 500")
+    parser.add_argument("--http", action="store_true", help="Talk to the mock over HTTP through AsyncOpenAI instead of in-process")
+    parser.add_argument("--port", type=int, default=8089, help="Port for the mock server (relay endpoints, and the API with --http)")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="Shortest request prefix the mock reports as cached")
+    parser.add_argument("--rpm", type=float, default=1_000_000, help="Rate limiter requests per minute")
+    parser.add_argument("--tpm", type=float, default=1_000_000_000, help="Rate limiter tokens per minute")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Admin approval threshold in the acceptance criteria")
+    parser.add_argument("--ranking-sizes", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the peak Python heap (slows the run)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Print the pipeline's own output to stderr afterwards")
+    parser.add_argument("--json", help="Write the results to this file")
+    asyncio.run(main(parser.parse_args()))
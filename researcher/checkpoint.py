@@ -0,0 +1,329 @@
+import asyncio
+import json
+import os
+from typing import Dict, Set, Tuple
+
+
+class CheckpointStore:
+    """
+    Append-only JSONL log plus a compacted JSON snapshot in one directory.
+
+    Log records are one of:
+      {"type": "criteria", "criteria": {ref: criteria}}         search criteria, each stored once
+      {"type": "ideas", "ideas": {id: idea record}}             new or changed ideas
+      {"type": "processed", "entries": [[id, scores]]}          newly processed ideas
+      {"type": "researched", "ids": [id]}                       newly researched ideas
+      {"type": "ratings", "elo": {id: rating}, "researched_elo": {id: rating}}   changed ratings
+      {"type": "outcomes", "set": [[id, id, score]], "removed": [[id, id]]}     changed comparisons
+      {"type": "sent", "ids": [id]}                             ideas newly sent to the relay
+      {"type": "state", "state": {...}}                         queues and ranking, as idea ids
+    Everything is keyed by idea id. Replaying the log over the snapshot yields
+    the latest state; compaction folds the log into a fresh snapshot and
+    truncates it. All methods are blocking and meant to run in a worker thread.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.log_path = os.path.join(directory, "log.jsonl")
+        self.log_records = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.log_path)
+
+    def append(self, records):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_records += len(records)
+
+    def load(self) -> dict:
+        data = {"criteria": {}, "ideas": {}, "processed": [], "researched": [], "ratings": {"elo": {}, "researched_elo": {}},
+                "outcomes": {}, "sent": [], "state": {}}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Torn write at the tail of the log
+                    self._apply(data, record)
+        return data
+
+    def compact(self):
+        data = self.load()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        open(self.log_path, "w").close()
+        self.log_records = 0
+
+    @staticmethod
+    def _apply(data: dict, record: dict):
+        if record["type"] == "criteria":
+            data["criteria"].update(record["criteria"])
+        elif record["type"] == "ideas":
+            data["ideas"].update(record["ideas"])
+        elif record["type"] == "processed":
+            data["processed"].extend(record["entries"])
+        elif record["type"] == "researched":
+            data["researched"].extend(record["ids"])
+        elif record["type"] == "ratings":
+            for table in ("elo", "researched_elo"):
+                data["ratings"][table].update(record.get(table, {}))
+        elif record["type"] == "outcomes":
+            # JSON object keys are strings, so a pair is stored as "a,b"
+            for a, b in record["removed"]:
+                data["outcomes"].pop(f"{a},{b}", None)
+            for a, b, score in record["set"]:
+                data["outcomes"][f"{a},{b}"] = score
+        elif record["type"] == "sent":
+            data["sent"].extend(record["ids"])
+        elif record["type"] == "state":
+            data["state"] = record["state"]
+
+
+class Checkpointer:
+    """
+    Periodically checkpoints an IdeaSearcher (and its IdeaResearcher) and restores it on resume.
+
+    Each checkpoint only writes what changed since the last one: new or
+    changed ideas, newly processed and researched ideas, changed ratings and
+    comparison outcomes, and ideas newly sent to the relay, all keyed by idea
+    id, plus the current queues and ranking. Each search criteria string is
+    written once and ideas refer to it. Records are built on the event loop,
+    but JSON encoding, file I/O and compaction run in a worker thread.
+    """
+
+    def __init__(self, searcher, directory: str = "checkpoints", interval: float = 30.0, compact_every: int = 100):
+        self.searcher = searcher
+        self.store = CheckpointStore(directory)
+        self.interval = interval
+        self.compact_every = compact_every
+        self.written_ideas: Dict[int, tuple] = {}  # idea_id -> fingerprint of the last written record
+        self.idea_ids: Dict[str, int] = {}  # Description -> id of the written idea, for state keyed by description
+        self.criteria_refs: Dict[str, int] = {}  # Serialized search criteria -> ref ideas use for it
+        self.written_processed = 0
+        self.written_researched: Set[int] = set()
+        self.written_ratings: Dict[Tuple[str, int], float] = {}  # (table, idea_id) -> rating
+        self.written_outcomes: Dict[Tuple[int, int], float] = {}  # (lower id, higher id) -> score of the lower
+        self.written_sent: Set[int] = set()
+        self.restored_work: Dict[str, list] = {"research": [], "digest": [], "rank": []}
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.checkpoint()
+        finally:
+            await self.checkpoint()
+
+    async def checkpoint(self):
+        records = self.build_records()
+        await asyncio.to_thread(self._write, records)
+
+    def _write(self, records):
+        self.store.append(records)
+        if self.store.log_records >= self.compact_every:
+            self.store.compact()
+
+    def criteria_ref(self, criteria, new_criteria: dict) -> int:
+        key = json.dumps(criteria, sort_keys=True)
+        if key not in self.criteria_refs:
+            self.criteria_refs[key] = len(self.criteria_refs)
+            new_criteria[self.criteria_refs[key]] = criteria
+        return self.criteria_refs[key]
+
+    def build_records(self):
+        searcher = self.searcher
+        researcher = searcher.idea_researcher
+
+        # Ideas still waiting in (or being handled by) a stage go back to their queue on resume
+        frontier = list(searcher.frontier)
+        frontier += [(item.priority, item.item) for item in searcher.pipeline.stages["evaluate"].outstanding_items()]
+        for stage_name in ("expand", "requirements"):
+            frontier += [(score, idea) for idea, score in searcher.pipeline.stages[stage_name].outstanding_items()]
+        research_queue = [(item.priority, item.item) for item in researcher.pipeline.stages["research"].outstanding_items()]
+        digest_queue = researcher.pipeline.stages["digest"].outstanding_items()
+        rank_queue = researcher.pipeline.stages["rank"].outstanding_items()
+
+        processed = searcher.processed_ideas[self.written_processed:]
+        researched = [idea for idea in researcher.researched_ideas.values() if idea.idea_id not in self.written_researched]
+        # Researched ideas stay roots, since a digest can land after they were first written
+        roots = ([idea for _, idea in frontier] + [idea for _, idea in research_queue]
+                 + digest_queue + rank_queue + [idea for idea, _ in processed] + list(researcher.researched_ideas.values()))
+
+        new_criteria = {}
+        changed = {}
+        for idea in roots:
+            while idea is not None:
+                fingerprint = (idea.idea_description, idea.requirements, idea.depth, idea.research, idea.research_digest)
+                if self.written_ideas.get(idea.idea_id) != fingerprint:
+                    self.written_ideas[idea.idea_id] = fingerprint
+                    self.idea_ids[idea.idea_description] = idea.idea_id
+                    changed[idea.idea_id] = idea_to_record(idea, self.criteria_ref(idea.search_criteria, new_criteria))
+                idea = idea.parent
+
+        ratings = {"elo": {}, "researched_elo": {}}
+        for table, source in (("elo", researcher.elo_ratings), ("researched_elo", researcher.researched_elo_ratings)):
+            for description, rating in source.items():
+                # Ratings of ideas not written yet are picked up once they are
+                idea_id = self.idea_ids.get(description)
+                if idea_id is not None and self.written_ratings.get((table, idea_id)) != rating:
+                    self.written_ratings[(table, idea_id)] = rating
+                    ratings[table][idea_id] = rating
+
+        ranker = researcher.researched_ranker
+        outcomes = {}
+        for (a, b), score in ranker.outcomes.items():
+            id_a, id_b = self.idea_ids.get(a), self.idea_ids.get(b)
+            if id_a is not None and id_b is not None and id_a < id_b:
+                outcomes[(id_a, id_b)] = score
+        set_outcomes = [[a, b, score] for (a, b), score in outcomes.items() if self.written_outcomes.get((a, b)) != score]
+        removed_outcomes = [[a, b] for a, b in self.written_outcomes if (a, b) not in outcomes]
+        self.written_outcomes = outcomes
+
+        sent = [self.idea_ids[description] for description in researcher.sent_ideas
+                if description in self.idea_ids and self.idea_ids[description] not in self.written_sent]
+        self.written_sent.update(sent)
+
+        state = {
+            "search_criteria": self.criteria_ref(searcher.search_criteria, new_criteria),
+            "acceptance_criteria": searcher.acceptance_criteria,
+            "frontier": [[priority, idea.idea_id] for priority, idea in frontier],
+            "research_queue": [[priority, idea.idea_id] for priority, idea in research_queue],
+            "digest_queue": [idea.idea_id for idea in digest_queue],
+            "rank_queue": [idea.idea_id for idea in rank_queue],
+            "researched_ranking": [researcher.researched_ideas[description].idea_id for description in ranker.ranking],
+            "researched_comparison_count": ranker.comparison_count,
+            "processed_synced": searcher.admin_sync.acked_seq,
+        }
+
+        records = []
+        if new_criteria:
+            records.append({"type": "criteria", "criteria": new_criteria})
+        if changed:
+            records.append({"type": "ideas", "ideas": changed})
+        if processed:
+            records.append({"type": "processed", "entries": [[idea.idea_id, scores] for idea, scores in processed]})
+            self.written_processed += len(processed)
+        if researched:
+            records.append({"type": "researched", "ids": [idea.idea_id for idea in researched]})
+            self.written_researched.update(idea.idea_id for idea in researched)
+        if ratings["elo"] or ratings["researched_elo"]:
+            records.append(dict(ratings, type="ratings"))
+        if set_outcomes or removed_outcomes:
+            records.append({"type": "outcomes", "set": set_outcomes, "removed": removed_outcomes})
+        if sent:
+            records.append({"type": "sent", "ids": sent})
+        records.append({"type": "state", "state": state})
+        return records
+
+    async def restore(self, idea_factory) -> bool:
+        """
+        Rebuilds the searcher and researcher from the latest checkpoint without
+        calling the model, except to embed restored ideas for deduplication.
+        idea_factory(idea_id, record, parent) must return an Idea. Queued
+        research, digest and rank work is put back by requeue_restored().
+        Returns False if there is nothing to resume from.
+        """
+        if not self.store.exists():
+            return False
+        data = await asyncio.to_thread(self.store.load)
+        searcher = self.searcher
+        researcher = searcher.idea_researcher
+        state = data["state"]
+
+        criteria = {int(ref): value for ref, value in data["criteria"].items()}
+        self.criteria_refs = {json.dumps(value, sort_keys=True): ref for ref, value in criteria.items()}
+        ideas = {}
+        for idea_id in sorted(data["ideas"], key=int):  # Parents always have lower ids
+            record = dict(data["ideas"][idea_id])
+            record["search_criteria"] = criteria[record["search_criteria"]]
+            parent = ideas.get(record["parent"]) if record["parent"] is not None else None
+            ideas[int(idea_id)] = idea_factory(int(idea_id), record, parent)
+        for idea_id, idea in ideas.items():
+            self.written_ideas[idea_id] = (idea.idea_description, idea.requirements, idea.depth, idea.research, idea.research_digest)
+            self.idea_ids[idea.idea_description] = idea_id
+
+        searcher.search_criteria = criteria.get(state.get("search_criteria"), searcher.search_criteria)
+        searcher.acceptance_criteria = state.get("acceptance_criteria", searcher.acceptance_criteria)
+        researcher.acceptance_criteria = searcher.acceptance_criteria
+        for priority, idea_id in state.get("frontier", []):
+            searcher.add_idea(ideas[idea_id], priority)
+        searcher.processed_ideas.extend((ideas[idea_id], scores) for idea_id, scores in data["processed"])
+        self.written_processed = len(searcher.processed_ideas)
+        searcher.admin_sync.acked_seq = state.get("processed_synced", -1)
+        # Everything seen before the restart still counts when judging new ideas
+        await searcher.filter_duplicates([ideas[idea_id] for _, idea_id in state.get("frontier", [])]
+                                         + [idea for idea, _ in searcher.processed_ideas])
+
+        for table, target in (("elo", researcher.elo_ratings), ("researched_elo", researcher.researched_elo_ratings)):
+            for idea_id, rating in data["ratings"][table].items():
+                target[ideas[int(idea_id)].idea_description] = rating
+                self.written_ratings[(table, int(idea_id))] = rating
+        for idea_id in data["researched"]:
+            researcher.researched_ideas[ideas[idea_id].idea_description] = ideas[idea_id]
+        self.written_researched.update(data["researched"])
+        ranker = researcher.researched_ranker
+        ranker.ranking = [ideas[idea_id].idea_description for idea_id in state.get("researched_ranking", [])]
+        for pair, score in data["outcomes"].items():
+            a, b = map(int, pair.split(","))
+            ranker.outcomes[(ideas[a].idea_description, ideas[b].idea_description)] = score
+            ranker.outcomes[(ideas[b].idea_description, ideas[a].idea_description)] = 1 - score
+            self.written_outcomes[(a, b)] = score
+        ranker.comparison_count = state.get("researched_comparison_count", 0)
+        researcher.rebuild_researched_queue()
+        researcher.sent_ideas.update(ideas[idea_id].idea_description for idea_id in data["sent"])
+        self.written_sent.update(data["sent"])
+
+        self.restored_work = {
+            "research": [(priority, ideas[idea_id]) for priority, idea_id in state.get("research_queue", [])],
+            "digest": [ideas[idea_id] for idea_id in state.get("digest_queue", [])],
+            "rank": [ideas[idea_id] for idea_id in state.get("rank_queue", [])],
+        }
+
+        print(f"Resumed from checkpoint: {len(ideas)} ideas, {len(searcher.frontier)} queued, "
+              f"{len(researcher.researched_ideas)} researched")
+        return True
+
+    async def requeue_restored(self):
+        """
+        Puts research, digest and rank work restored from a checkpoint back on
+        the pipeline. The stages are bounded, so this completes once the
+        pipeline is running.
+        """
+        researcher = self.searcher.idea_researcher
+        work, self.restored_work = self.restored_work, {"research": [], "digest": [], "rank": []}
+
+        async def research():
+            for priority, idea in work["research"]:
+                await researcher.add_idea(idea, priority)
+
+        async def put_all(stage_name):
+            for idea in work[stage_name]:
+                await researcher.pipeline.put(stage_name, idea)
+
+        await asyncio.gather(research(), put_all("digest"), put_all("rank"))
+
+
+def idea_to_record(idea, criteria_ref: int) -> dict:
+    return {
+        "idea_description": idea.idea_description,
+        "requirements": idea.requirements,
+        "search_criteria": criteria_ref,
+        "parent": idea.parent.idea_id if idea.parent is not None else None,
+        "depth": idea.depth,
+        "research": idea.research,
+        "research_score": idea.research_score,
+        "research_digest": idea.research_digest,
+    }
@@ -0,0 +1,180 @@
+import asyncio
+import json
+from typing import Optional, Set
+
+from aiohttp import web
+
+from metrics import metrics
+
+
+class EventHub:
+    """
+    Fans live search events (processed ideas, research progress, ranking
+    changes, criteria updates) out to every subscribed admin client.
+
+    Each subscriber gets its own bounded queue. A client that falls behind
+    loses its oldest events rather than slowing the search down or growing
+    memory without bound.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+                metrics.inc("control_plane_events_dropped_total", event=event)
+            queue.put_nowait((event, data))
+        metrics.inc("control_plane_events_total", event=event)
+
+
+class ControlPlane:
+    """
+    The admin HTTP API, served by aiohttp on the searcher's own event loop.
+
+    Criteria updates and feedback are applied to the searcher directly, and
+    GET /events streams live results to any number of clients as server-sent
+    events, so admin tools no longer have to poll the relay.
+    """
+
+    def __init__(self, searcher, host: str = "127.0.0.1", port: int = 7000):
+        self.searcher = searcher
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = 15  # Seconds between SSE keep-alive comments on an idle stream
+        self.shutdown_timeout = 1.0  # Seconds open event streams get to finish when the server stops
+        self.runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[_cors])
+        app.router.add_post("/update_search_criteria", self.update_search_criteria)
+        app.router.add_post("/update_acceptance_criteria", self.update_acceptance_criteria)
+        app.router.add_post("/feedback", self.feedback)
+        app.router.add_get("/state", self.state)
+        app.router.add_get("/events", self.stream_events)
+        app.router.add_get("/metrics", self.get_metrics)
+        metrics.gauge("control_plane_subscribers", lambda: len(events.subscribers))
+        return app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.make_app(), shutdown_timeout=self.shutdown_timeout)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"Control plane listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def update_search_criteria(self, request):
+        body = await _json_body(request)
+        if body is None:
+            return _bad_request("the body must be a JSON object")
+        criteria = body.get("search_criteria")
+        if not isinstance(criteria, str) or not criteria:
+            return _bad_request("search_criteria must be a non-empty string")
+        await self.searcher.update_search_criteria(criteria)
+        return web.json_response({"message": "Search criteria updated"})
+
+    async def update_acceptance_criteria(self, request):
+        body = await _json_body(request)
+        if body is None:
+            return _bad_request("the body must be a JSON object")
+        criteria = body.get("acceptance_criteria")
+        if not isinstance(criteria, dict):
+            return _bad_request("acceptance_criteria must be an object")
+        await self.searcher.update_acceptance_criteria(criteria)
+        return web.json_response({"message": "Acceptance criteria updated"})
+
+    async def feedback(self, request):
+        body = await _json_body(request)
+        if body is None:
+            return _bad_request("the body must be a JSON object")
+        feedback = body.get("feedback")
+        if not isinstance(feedback, str) or not feedback:
+            return _bad_request("feedback must be a non-empty string")
+        print("Received feedback:", feedback)
+        await self.searcher.update_search_criteria(feedback)
+        return web.json_response({"message": "Feedback received"})
+
+    async def state(self, request):
+        try:
+            top = max(0, int(request.query.get("top", 10)))
+        except ValueError:
+            return _bad_request("top must be an integer")
+        researcher = self.searcher.idea_researcher
+        return web.json_response({
+            "search_criteria": self.searcher.search_criteria,
+            "acceptance_criteria": self.searcher.acceptance_criteria,
+            "criteria_version": self.searcher.criteria_version,
+            "frontier_size": len(self.searcher.frontier),
+            "processed_ideas": len(self.searcher.processed_ideas),
+            "researched_ideas": len(researcher.researched_ideas),
+            "ranking": researcher.researched_ranker.ranking[:top],
+        })
+
+    async def stream_events(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                               "Access-Control-Allow-Origin": "*"})
+        await response.prepare(request)
+        queue = events.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        except ConnectionResetError:
+            pass  # The client went away
+        finally:
+            events.unsubscribe(queue)
+        return response
+
+    async def get_metrics(self, request):
+        if request.query.get("format") == "json":
+            return web.json_response(metrics.snapshot())
+        return web.Response(text=metrics.prometheus(), content_type="text/plain")
+
+
+async def _json_body(request) -> Optional[dict]:
+    # None unless the body is a JSON object
+    try:
+        body = await request.json()
+    except ValueError:  # json.JSONDecodeError is a ValueError
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _bad_request(message: str) -> web.Response:
+    return web.json_response({"error": message}, status=400)
+
+
+@web.middleware
+async def _cors(request, handler):
+    # The admin UI calls the API from another origin
+    if request.method == "OPTIONS":
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    else:
+        response = await handler(request)
+    if not response.prepared:  # Event streams set their headers before they start
+        response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+# Published to by the searcher and the researcher, streamed by the control plane
+events = EventHub()
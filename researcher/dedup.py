@@ -0,0 +1,60 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class DedupIndex:
+    """
+    Near-duplicate index over idea descriptions, compared by meaning.
+
+    Each description comes with an embedding (see llm_client.embed), and the
+    normalized vectors are kept in one NumPy matrix so a nearest-neighbour
+    lookup is a single matrix-vector product against every admitted idea.
+    Texts whose cosine similarity to an admitted one is at or above
+    `threshold` count as duplicates. Shingle overlap does not work for this:
+    a paraphrase shares few words with the original, while two different
+    ideas generated from one template share most of theirs.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.vectors: Optional[np.ndarray] = None  # Sized on the first admit, once the dimension is known
+        self.texts: List[str] = []
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def nearest(self, embedding: Sequence[float]) -> Tuple[Optional[str], float]:
+        """
+        The admitted text most similar to `embedding`, and its cosine similarity.
+        """
+        if not self.texts:
+            return None, 0.0
+        similarities = self.vectors[:len(self.texts)] @ self.normalize(embedding)
+        best = int(similarities.argmax())
+        return self.texts[best], float(similarities[best])
+
+    def admit(self, text: str, embedding: Sequence[float]) -> Tuple[bool, Optional[str], float]:
+        """
+        Adds the text unless it is a near-duplicate of an admitted one. Returns
+        whether it was admitted, with the nearest admitted text and its similarity.
+        """
+        match, similarity = self.nearest(embedding)
+        if match is not None and similarity >= self.threshold:
+            self.rejected += 1
+            return False, match, similarity
+        vector = self.normalize(embedding)
+        if self.vectors is None:
+            self.vectors = np.empty((64, len(vector)), dtype=np.float32)
+        elif len(self.texts) == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+        self.vectors[len(self.texts)] = vector
+        self.texts.append(text)
+        return True, match, similarity
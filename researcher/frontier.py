@@ -0,0 +1,183 @@
+import heapq
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class Frontier:
+    """
+    Best-first frontier of ideas waiting to be evaluated.
+
+    An indexed binary max-heap: pop() returns the highest-priority idea, and
+    positions are tracked by idea_id so an idea's priority can be updated or
+    the idea removed in O(log n). Ideas are ordered by their priority plus a
+    depth bonus that grows from requirement_expansion_depth to depth_limit, so
+    lineages that are close to research get finished rather than left behind
+    by fresh seeds. The frontier holds at most max_size ideas and, if
+    beam_width is set, at most beam_width ideas per depth; the worst ideas are
+    evicted in batches once either bound is exceeded by the slack, which keeps
+    eviction amortized O(log n) per push.
+    """
+
+    def __init__(self, max_size: int = 200, beam_width: Optional[int] = None, depth_bonus: float = 0.0,
+                 depth_limit: int = 2, requirement_expansion_depth: int = 1, slack: float = 0.25):
+        self.max_size = max_size
+        self.beam_width = beam_width
+        self.depth_bonus = depth_bonus
+        self.depth_limit = depth_limit
+        self.requirement_expansion_depth = requirement_expansion_depth
+        self.slack = slack
+        self.heap: List[list] = []  # [sort key, priority, idea]
+        self.index: Dict[int, int] = {}  # idea_id -> position in heap
+        self.depth_counts = Counter()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __contains__(self, idea_id: int) -> bool:
+        return idea_id in self.index
+
+    def __iter__(self) -> Iterator[Tuple[float, object]]:
+        """
+        (priority, idea) pairs in heap order, not sorted.
+        """
+        return ((priority, idea) for _, priority, idea in self.heap)
+
+    def sort_key(self, priority: float, idea) -> tuple:
+        # Deeper ideas get up to depth_bonus extra; older ideas win ties
+        span = max(1, self.depth_limit - self.requirement_expansion_depth + 1)
+        progress = max(0, min(idea.depth, self.depth_limit) - self.requirement_expansion_depth + 1)
+        return (priority + self.depth_bonus * progress / span, -idea.idea_id)
+
+    def push(self, idea, priority: float):
+        """
+        Adds an idea, or updates its priority if it is already queued.
+        """
+        if idea.idea_id in self.index:
+            self.update(idea, priority)
+            return
+        self.heap.append([self.sort_key(priority, idea), priority, idea])
+        self.index[idea.idea_id] = len(self.heap) - 1
+        self.depth_counts[idea.depth] += 1
+        self._sift_up(len(self.heap) - 1)
+        if self._over_bounds(idea.depth):
+            self.prune()
+
+    def update(self, idea, priority: float) -> bool:
+        """
+        Changes the priority of a queued idea; returns False if it is not queued.
+        """
+        position = self.index.get(idea.idea_id)
+        if position is None:
+            return False
+        entry = self.heap[position]
+        # An idea's depth is fixed when it is created, so depth_counts need no change
+        old_key = entry[0]
+        entry[0], entry[1], entry[2] = self.sort_key(priority, idea), priority, idea
+        if entry[0] > old_key:
+            self._sift_up(position)
+        else:
+            self._sift_down(position)
+        return True
+
+    def pop(self) -> Tuple[float, object]:
+        """
+        Removes and returns the best (priority, idea).
+        """
+        if not self.heap:
+            raise IndexError("pop from an empty frontier")
+        _, priority, idea = self._remove_at(0)
+        return priority, idea
+
+    def peek(self) -> Tuple[float, object]:
+        """
+        The best (priority, idea), without removing it.
+        """
+        if not self.heap:
+            raise IndexError("peek at an empty frontier")
+        _, priority, idea = self.heap[0]
+        return priority, idea
+
+    def top(self, k: int) -> List[Tuple[float, object]]:
+        """
+        The k best (priority, idea) pairs, best first, in O(n log k).
+        """
+        return [(priority, idea) for _, priority, idea in heapq.nlargest(k, self.heap, key=lambda entry: entry[0])]
+
+    def remove(self, idea_id: int) -> bool:
+        position = self.index.get(idea_id)
+        if position is None:
+            return False
+        self._remove_at(position)
+        return True
+
+    def clear(self):
+        self.heap = []
+        self.index = {}
+        self.depth_counts = Counter()
+
+    def prune(self):
+        """
+        Evicts the worst ideas until max_size and beam_width hold.
+        """
+        kept, kept_per_depth = [], Counter()
+        for entry in sorted(self.heap, key=lambda entry: entry[0], reverse=True):
+            depth = entry[2].depth
+            if len(kept) >= self.max_size or (self.beam_width is not None and kept_per_depth[depth] >= self.beam_width):
+                continue
+            kept.append(entry)
+            kept_per_depth[depth] += 1
+
+        evicted = len(self.heap) - len(kept)
+        if evicted:
+            self.evicted += evicted
+            print(f"Frontier evicted {evicted} low-priority ideas ({len(kept)} kept)")
+        # A list sorted best-first already satisfies the heap property
+        self.heap = kept
+        self.index = {entry[2].idea_id: position for position, entry in enumerate(kept)}
+        self.depth_counts = kept_per_depth
+
+    def _over_bounds(self, depth: int) -> bool:
+        if len(self.heap) > self.max_size * (1 + self.slack):
+            return True
+        return self.beam_width is not None and self.depth_counts[depth] > self.beam_width * (1 + self.slack)
+
+    def _remove_at(self, position: int) -> list:
+        entry = self.heap[position]
+        last = self.heap.pop()
+        del self.index[entry[2].idea_id]
+        self.depth_counts[entry[2].depth] -= 1
+        if position < len(self.heap):
+            self.heap[position] = last
+            self.index[last[2].idea_id] = position
+            self._sift_up(position)
+            self._sift_down(self.index[last[2].idea_id])
+        return entry
+
+    def _swap(self, i: int, j: int):
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.index[self.heap[i][2].idea_id] = i
+        self.index[self.heap[j][2].idea_id] = j
+
+    def _sift_up(self, position: int):
+        while position > 0:
+            parent = (position - 1) // 2
+            if self.heap[position][0] <= self.heap[parent][0]:
+                break
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position: int):
+        size = len(self.heap)
+        while True:
+            best = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and self.heap[child][0] > self.heap[best][0]:
+                    best = child
+            if best == position:
+                return
+            self._swap(position, best)
+            position = best
@@ -4,10 +4,16 @@ from dataclasses import dataclass, field
 from typing import Any, List, Tuple
 import json
 import random
+import re
+import time
 import aiohttp
+from ranking import make_ranking_engine
+from pipeline import Pipeline
 
-from openai import AsyncOpenAI
-async_openai = AsyncOpenAI()
+from llm_client import llm_client
+from metrics import metrics
+from control_plane import events
+from prompts import prompt_messages
 
 class bcolors:
     HEADER = '\033[95m'
@@ -20,26 +26,105 @@ class bcolors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
-@dataclass(order=True)
+research_digest_tool = [
+{
+  "type": "function",
+  "function": {
+    "name": "summarize_research",
+    "description": "Summarize a research report on a business idea into a short structured digest.",
+    "parameters": {
+      "type": "object",
+      "properties": {
+        "compound_score": {
+          "type": "number",
+          "description": "The compound score out of 10 given in the report."
+        },
+        "funding_level": {
+          "type": "string",
+          "description": "The funding the idea needs, in a few words, e.g. \"bootstrapped\" or \"$2M seed round\"."
+        },
+        "team_needs": {
+          "type": "string",
+          "description": "The key team members the idea needs, in one short sentence."
+        },
+        "key_risks": {
+          "type": "array",
+          "description": "The most important risks, at most three, a few words each.",
+          "items": {"type": "string"}
+        },
+        "verdict": {
+          "type": "string",
+          "description": "One sentence on how realistic it is to satisfy the requirements."
+        }
+      },
+      "required": ["compound_score", "funding_level", "team_needs", "key_risks", "verdict"],
+      "additionalProperties": False
+    }
+  }
+}
+]
+
+@dataclass
 class PrioritizedResearchItem:
     priority: float
     item: Any = field(compare=False)
 
+    def __lt__(self, other):
+        # Research queues are min-heaps; the highest priority comes out first, as on the frontier
+        return self.priority > other.priority
+
 class IdeaResearcher:
-    def __init__(self, acceptance_criteria: dict, endpoint_url: str = None):
+    def __init__(self, acceptance_criteria: dict, endpoint_url: str = None, pipeline: Pipeline = None):
         self.acceptance_criteria = acceptance_criteria
-        self.research_queue: List[PrioritizedResearchItem] = []
+        self.research_workers = 2  # Number of research calls in flight at once
+        self.research_queue_size = 20  # Bound on queued research; add_idea blocks when full
+        self.research_queue = asyncio.PriorityQueue(maxsize=self.research_queue_size)
         self.researched_ideas_queue: List[PrioritizedResearchItem] = []
         self.lock = asyncio.Lock()
         self.elo_ratings = {}
         self.researched_elo_ratings = {}
         self.k_factor = 32  # ELO K-factor
-        self.comparison_cache = {}  # Cache for storing comparison results
         self.paused = asyncio.Event()
         self.paused.set()  # Initially not paused
         self.endpoint_url = "http://localhost:9000/idea"
+        self.progress_url = "http://localhost:9000/research_progress"
+        self.stream_research = True  # Stream research responses and rank as soon as the score arrives
+        self.early_rank_min_chars = 400  # Research text needed (with a score) before an idea is ranked early
+        self.progress_interval = 1.0  # Seconds between partial research pushes to the admin UI
+        self.digest_research = True  # Rank on a short digest of the research instead of the full report
+        self.digest_workers = 2  # Number of digest calls in flight at once
+        self.digest_field_chars = 160  # Bound on each digest field, so every digest stays a few hundred characters
         self.researched_ideas = {}  # New dictionary to store full Idea objects
         self.sent_ideas = set()  # New set to keep track of sent ideas
+        self.streaming_ideas = set()  # Ideas ranked early whose research is still streaming; not sent until it ends
+        self.ranking_strategy = "listwise"  # One of ranking.RANKING_ENGINES
+        self.listwise_window_size = 5  # Ideas ordered per LLM call by the listwise strategy
+        researched_options = {"listwise": {"rank_window": self.rank_researched_window, "window_size": self.listwise_window_size}}
+        queue_options = {"listwise": {"rank_window": self.rank_ideas_window, "window_size": self.listwise_window_size}}
+        self.researched_ranker = make_ranking_engine(
+            self.ranking_strategy, self._compare_researched_keys, self.researched_elo_ratings, k_factor=self.k_factor,
+            **researched_options.get(self.ranking_strategy, {})
+        )
+        # The research queue is re-ranked in one shared sweep when the acceptance criteria change
+        self.queue_ranker = make_ranking_engine(
+            self.ranking_strategy, self.compare_ideas, self.elo_ratings, k_factor=self.k_factor,
+            **queue_options.get(self.ranking_strategy, {})
+        )
+        self.rerank_publish_every = 5  # Push partial re-ranking results to the queue every N ideas
+        self.rerank_task = None
+
+        # Research and ranking run as stages of the (possibly shared) pipeline
+        self.pipeline = pipeline or Pipeline()
+        self.pipeline.add_stage("research", self.research_stage, workers=self.research_workers, queue=self.research_queue)
+        self.pipeline.add_stage("digest", self.digest_stage, workers=self.digest_workers)
+        self.pipeline.add_stage("rank", self.rank_stage, workers=1)
+
+        metrics.gauge("researched_ideas", lambda: len(self.researched_ideas))
+        metrics.gauge("ranking_comparisons", lambda: self.researched_ranker.comparison_count, ranker="researched")
+        metrics.gauge("ranking_comparisons", lambda: self.queue_ranker.comparison_count, ranker="queue")
+        metrics.gauge("ranking_calls", lambda: self.researched_ranker.call_count, ranker="researched")
+        metrics.gauge("ranking_calls", lambda: self.queue_ranker.call_count, ranker="queue")
+        metrics.gauge("ranking_confidence", self.researched_ranker.confidence)
 
     async def add_idea(self, idea, combined_score):
         print(bcolors.ENDC)
@@ -50,43 +135,76 @@ class IdeaResearcher:
             if idea.idea_description not in self.elo_ratings:
                 self.elo_ratings[idea.idea_description] = 1500  # Initial ELO rating
             
-            priority = combined_score # self.elo_ratings[idea.idea_description]
-            heapq.heappush(self.research_queue, PrioritizedResearchItem(priority, idea))
-
-    async def process_queue(self):
-        while self.research_queue:
-            print("Researcher queue polling....")
-            await self.paused.wait()  # Wait if pause
-            
-            async with self.lock:
-                prioritized_item = heapq.heappop(self.research_queue)
-                idea = prioritized_item.item
-
+            # Queued research is prioritised on the 1-5 combined score scale throughout
+            priority = combined_score
+        # Blocks while the research stage is full, which backs up the searcher
+        await self.pipeline.put("research", PrioritizedResearchItem(priority, idea))
+
+    async def research_stage(self, prioritized_item):
+        await self.paused.wait()  # Wait if paused
+        idea = prioritized_item.item
+        if self.stream_research:
+            # Hands the idea on itself, possibly before the research is complete
+            await self.research_idea_streaming(idea)
+        else:
             await self.research_idea(idea)
-            #await self.update_elo_ratings()
-
-    async def research_idea(self, idea):
-        print("Researching idea", idea.idea_description)
-        research_prompt = f"""
-        For the following business idea and its requirements, evaluate:
-        1. What online research is needed to validate the work involved?
-        2. How realistic is it to satisfy the requirements?
-        3. What level of funding will be required and what kind of team members for it?
-
-        Business Idea: {idea.idea_description}
-        Requirements: {idea.requirements}
-
-        Please provide a detailed response for both questions.
+            await self.pipeline.put("digest" if self.digest_research else "rank", idea)
+
+    async def digest_stage(self, idea):
+        if idea.research_digest is None:
+            try:
+                await self.summarize_research(idea)
+            except Exception as e:
+                # Ranking falls back to the full report
+                print(f"Error digesting research for '{idea.idea_description}': {e!r}")
+        await self.pipeline.put("rank", idea)
+
+    async def rank_stage(self, idea):
+        await self.add_researched_idea(idea)
 
-        Finally give a compound score out of 10, weighing everything together.
+    async def summarize_research(self, idea):
+        """
+        Condenses an idea's research report into a digest of a few hundred
+        characters, cached on the idea, which ranking prompts use in place of the
+        report. Each report is digested once, however many times it is compared.
         """
+        response = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="research",
+            site="digest",
+            messages=prompt_messages("digest", idea=idea.idea_description, research=idea.research),
+            tools=research_digest_tool,
+            tool_choice={"type": "function", "function": {"name": "summarize_research"}}
+        )
+        digest = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
+        idea.research_digest = self.format_digest(digest, idea.research_score)
+
+    def format_digest(self, digest: dict, research_score=None) -> str:
+        clip = lambda text: str(text)[:self.digest_field_chars]
+        score = research_score if research_score is not None else digest.get("compound_score")
+        return "\n".join([
+            f"Compound score: {score}/10",
+            f"Funding: {clip(digest.get('funding_level', 'unknown'))}",
+            f"Team: {clip(digest.get('team_needs', 'unknown'))}",
+            f"Key risks: {clip('; '.join(map(str, digest.get('key_risks', [])[:3])))}",
+            f"Verdict: {clip(digest.get('verdict', ''))}",
+        ])
+
+    @staticmethod
+    def research_summary(idea) -> str:
+        # The digest when there is one; the full report otherwise, e.g. if digesting failed
+        return idea.research_digest if idea.research_digest is not None else idea.research
+
+    def research_messages(self, idea):
+        return prompt_messages("research", idea=idea.idea_description, requirements=idea.requirements)
 
-        response = await async_openai.chat.completions.create(
+    async def research_idea(self, idea):
+        print("Researching idea", idea.idea_description)
+        response = await llm_client.chat_completion(
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert business analyst and researcher."},
-                {"role": "user", "content": research_prompt},
-            ]
+            lane="research",
+            site="research",
+            messages=self.research_messages(idea)
         )
 
         research_results = response.choices[0].message.content
@@ -95,184 +213,265 @@ class IdeaResearcher:
         print(f"\n\nRESEARCH RESULTS:\nIdea: '{idea.idea_description}':\nResults:{research_results}\n\n")
         print(bcolors.ENDC)
         idea.research = research_results
-        
-        # Add the researched idea to the researched_ideas_queue
-        await self.add_researched_idea(idea)
+        idea.research_score = parse_compound_score(research_results)
+        idea.research_digest = None
+
+    async def research_idea_streaming(self, idea):
+        """
+        Streams the research for an idea. idea.research grows as text arrives, the
+        compound score is parsed as soon as it appears, and the idea is put on the
+        rank stage once it has a score and early_rank_min_chars of text. Partial
+        research is pushed to the admin UI every progress_interval seconds, but
+        the idea is only sent to the relay once the stream ends. Ranking on a
+        digest needs the whole report, so with digest_research the idea is not
+        ranked early: the early score is only reported with the progress, and
+        the idea goes to the digest stage once the stream ends.
+        """
+        print("Researching idea (streaming)", idea.idea_description)
+        idea.research = ""
+        idea.research_score = None
+        idea.research_digest = None
+        parts = []
+        ranked = self.digest_research  # Ranked once, on the digest
+        last_push = time.monotonic()
+        self.streaming_ideas.add(idea.idea_description)
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async for delta in llm_client.chat_completion_stream(
+                    model="gpt-4o-mini",
+                    lane="research",
+                    site="research",
+                    messages=self.research_messages(idea)
+                ):
+                    parts.append(delta)
+                    idea.research = "".join(parts)
+                    if idea.research_score is None:
+                        idea.research_score = parse_compound_score(idea.research)
+                    if not ranked and idea.research_score is not None and len(idea.research) >= self.early_rank_min_chars:
+                        print(f"Ranking '{idea.idea_description}' early with compound score {idea.research_score}")
+                        await self.pipeline.put("rank", idea)
+                        ranked = True
+                    if time.monotonic() - last_push >= self.progress_interval:
+                        await self.push_research_progress(session, idea, done=False)
+                        last_push = time.monotonic()
+
+                await self.push_research_progress(session, idea, done=True)
+        finally:
+            self.streaming_ideas.discard(idea.idea_description)
+
+        print(bcolors.OKCYAN)
+        print(f"\n\nRESEARCH RESULTS:\nIdea: '{idea.idea_description}':\nResults:{idea.research}\n\n")
+        print(bcolors.ENDC)
+        if self.digest_research:
+            await self.pipeline.put("digest", idea)
+        elif not ranked:
+            await self.pipeline.put("rank", idea)
+        else:
+            # Ranked early, so the relay gets the full report now that it is complete
+            await self.send_best_idea_to_endpoint()
+
+    async def push_research_progress(self, session, idea, done: bool):
+        payload = {
+            "idea": idea.idea_description,
+            "research": idea.research,
+            "compound_score": idea.research_score,
+            "done": done,
+        }
+        events.publish("research_progress", payload)
+        try:
+            async with session.post(self.progress_url, json=payload) as response:
+                if response.status != 200:
+                    print(f"Failed to push research progress. Status code: {response.status}")
+        except aiohttp.ClientError as e:
+            print(f"Error pushing research progress: {e}")
 
     async def add_researched_idea(self, idea):
         async with self.lock:
-            if idea.idea_description not in self.researched_elo_ratings:
-                self.researched_elo_ratings[idea.idea_description] = 1500  # Initial ELO rating
-            
-            priority = self.researched_elo_ratings[idea.idea_description]
-            heapq.heappush(self.researched_ideas_queue, PrioritizedResearchItem(priority, idea))
             self.researched_ideas[idea.idea_description] = idea  # Store the full Idea object
-        
-        # Trigger recomputation of researched ideas ELO ratings
-        await self.update_researched_elo_ratings()
-
-    async def update_elo_ratings(self):
-        ideas = list(self.elo_ratings.keys())
-        if len(ideas) < 2:
-            print("Not enough ideas to compare.")
-            return
-        for i in range(len(ideas)):
-            for j in range(i + 1, len(ideas)):
-                await self.compare_ideas(ideas[i], ideas[j])
+
+        # Insert into the ranking with O(log n) / O(k) comparisons depending on the strategy
+        await self.researched_ranker.insert(idea.idea_description)
+
+        async with self.lock:
+            self.rebuild_researched_queue()
+        ranking = self.researched_ranker.ranking
+        events.publish("researched_idea", {
+            "idea": idea.idea_description,
+            "compound_score": idea.research_score,
+            "rank": ranking.index(idea.idea_description) + 1,
+            "ranked": len(ranking),
+            "confidence": self.researched_ranker.confidence(),
+        })
+        print(f"Ranked {len(ranking)} researched ideas with {self.researched_ranker.comparison_count} comparisons "
+              f"in {self.researched_ranker.call_count} calls so far "
+              f"(confidence {self.researched_ranker.confidence():.2f})")
+
+        # After updating the ranking, send the best idea to the endpoint
+        print("Sending best idea after ranking researched items")
+        await self.send_best_idea_to_endpoint()
+
+    def rebuild_researched_queue(self):
+        # Researched ideas are prioritised by their position in the ranking
+        ranking = self.researched_ranker.ranking
+        self.researched_ideas_queue = [
+            PrioritizedResearchItem(len(ranking) - position, self.researched_ideas[description])
+            for position, description in enumerate(ranking)
+        ]
+        heapq.heapify(self.researched_ideas_queue)
 
     async def compare_ideas(self, idea1, idea2):
-        # Sort ideas to ensure consistent cache key
-        sorted_ideas = tuple(sorted([idea1, idea2]))
-        cache_key = f"{sorted_ideas[0]}|{sorted_ideas[1]}"
-
-        # Check if comparison result is in cache
-        if cache_key in self.comparison_cache:
-            result = self.comparison_cache[cache_key]
-            print(f"Using cached comparison result")
-        else:
-            comparison_prompt = f"""
-            Compare the following two business ideas based on these criteria:
-            {self.acceptance_criteria.get('free_text', '')}
-
-            Idea 1: {idea1}
-            Idea 2: {idea2}
-
-            Which idea is better? Respond with either "1" or "2".
-            """
-
-            response = await async_openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert business idea evaluator."},
-                    {"role": "user", "content": comparison_prompt},
-                ]
+        # Present ideas in sorted order so (a, b) and (b, a) share one cached LLM response
+        first, second = sorted([idea1, idea2])
+        response = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="rank",
+            site="compare",
+            messages=prompt_messages(
+                "compare", free_text=self.acceptance_criteria.get('free_text', ''), first=first, second=second
             )
+        )
 
-            result = response.choices[0].message.content.strip()
-            
-            # Store the result in the cache
-            self.comparison_cache[cache_key] = result
-            print(f"Caching comparison result")
+        result = response.choices[0].message.content.strip()
+        return self._score_for(idea1 == first, result)
 
-        if "1" in result:
-            self.update_elo(idea1, idea2, 1)
-        elif "2" in result:
-            self.update_elo(idea2, idea1, 1)
-        else:
-            self.update_elo(idea1, idea2, 0.5)
+    async def rank_ideas_window(self, descriptions: List[str]) -> List[str]:
+        """
+        Orders a window of queued ideas best first with a single LLM call.
+        """
+        # Present ideas in sorted order so the same window always shares one cached LLM response
+        ideas = sorted(descriptions)
+        listing = "\n".join(f"Idea {i}: {idea}" for i, idea in enumerate(ideas, start=1))
+        response = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="rank",
+            site="rank_window",
+            messages=prompt_messages("rank_window", free_text=self.acceptance_criteria.get('free_text', ''), listing=listing)
+        )
 
-    def update_elo(self, winner, loser, score):
-        winner_rating = self.elo_ratings[winner]
-        loser_rating = self.elo_ratings[loser]
+        order = parse_ranking(response.choices[0].message.content, len(ideas))
+        return [ideas[i] for i in order]
 
-        expected_winner = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
-        expected_loser = 1 - expected_winner
+    async def rank_researched_window(self, descriptions: List[str]) -> List[str]:
+        """
+        Orders a window of researched ideas best first with a single LLM call.
+        """
+        # Present ideas in sorted order so the same window always shares one cached LLM response
+        ideas = [self.researched_ideas[description] for description in sorted(descriptions)]
+        listing = "\n\n".join(
+            f"Idea {i}: {idea.idea_description}\nResearch summary {i}: {self.research_summary(idea)}"
+            for i, idea in enumerate(ideas, start=1)
+        )
+        response = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="rank",
+            site="researched_rank_window",
+            messages=prompt_messages(
+                "researched_rank_window", free_text=self.acceptance_criteria.get('free_text', ''), listing=listing
+            )
+        )
 
-        self.elo_ratings[winner] += self.k_factor * (score - expected_winner)
-        self.elo_ratings[loser] += self.k_factor * ((1 - score) - expected_loser)
+        order = parse_ranking(response.choices[0].message.content, len(ideas))
+        return [ideas[i].idea_description for i in order]
+
+    @staticmethod
+    def _score_for(is_first: bool, result: str) -> float:
+        """
+        Converts a "1"/"2" verdict into the score of the idea presented first or second.
+        """
+        if "1" in result:
+            score = 1
+        elif "2" in result:
+            score = 0
+        else:
+            score = 0.5
+        return score if is_first else 1 - score
 
     async def update_acceptance_criteria(self, new_criteria: dict):
         async with self.lock:
-            self.paused.clear()  # Pause the queue
             self.acceptance_criteria = new_criteria
-            self.comparison_cache.clear()  # Clear the comparison cache
-            await self.recompute_priorities()
-            self.paused.set()  # Resume the queue
+            # Re-rank in the background; the queue keeps being served meanwhile
+            if self.rerank_task is not None and not self.rerank_task.done():
+                self.rerank_task.cancel()
+            self.rerank_task = asyncio.create_task(self.recompute_priorities())
 
     async def recompute_priorities(self):
-        new_queue = []
-        tasks = []
-        
-        while self.research_queue:
-            prioritized_item = heapq.heappop(self.research_queue)
-            idea = prioritized_item.item
-            tasks.append(self._recompute_priority_for_idea(idea, new_queue))
-        
-        await asyncio.gather(*tasks)
-        self.research_queue = new_queue
-
-    async def _recompute_priority_for_idea(self, idea, new_queue):
-        # Recompute ELO rating based on new acceptance criteria
-        await self.update_elo_ratings()
-        new_priority = self.elo_ratings[idea.idea_description]
-        heapq.heappush(new_queue, PrioritizedResearchItem(new_priority, idea))
+        """
+        Re-ranks the whole research queue with one shared comparison sweep.
+
+        Each queued idea is inserted once into a fresh ranking, and partial
+        results are applied to the heap every rerank_publish_every ideas so the
+        queue can keep serving the best-known order before the sweep finishes.
+        """
+        async with self.lock:
+            descriptions = [item.item.idea_description for item in self._research_queue_items()]
+        self.queue_ranker.reset()
+        for description in descriptions:
+            self.elo_ratings[description] = self.queue_ranker.initial_rating
+
+        for i, description in enumerate(descriptions, start=1):
+            await self.queue_ranker.insert(description)
+            if i % self.rerank_publish_every == 0 or i == len(descriptions):
+                await self._apply_queue_ranking()
+        print(f"Re-ranked {len(descriptions)} queued ideas with {self.queue_ranker.comparison_count} comparisons "
+              f"in {self.queue_ranker.call_count} calls so far")
+
+    async def _apply_queue_ranking(self):
+        async with self.lock:
+            # Ideas popped during the sweep are simply gone; ideas added since keep their combined score
+            items = self._drain_research_queue()
+            positions = {description: position for position, description in enumerate(self.queue_ranker.ranking)}
+            ranked = sorted((item for item in items if item.item.idea_description in positions),
+                            key=lambda item: positions[item.item.idea_description])
+            # Ranked ideas trade their scores so the order follows the ranking but the scale stays that of add_idea
+            scores = sorted((item.priority for item in ranked), reverse=True)
+            for item, score in zip(ranked, scores):
+                item.priority = score
+            for item in items:
+                self.research_queue.put_nowait(item)
+
+    def _drain_research_queue(self) -> List[PrioritizedResearchItem]:
+        items = []
+        while not self.research_queue.empty():
+            items.append(self.research_queue.get_nowait())
+        return items
+
+    def _research_queue_items(self) -> List[PrioritizedResearchItem]:
+        items = self._drain_research_queue()
+        for item in items:
+            self.research_queue.put_nowait(item)
+        return items
 
     async def start_processing(self):
+        """
+        Runs the research and rank stages. Only needed when the researcher owns
+        its pipeline; a shared pipeline is run by its owner.
+        """
         print("Started researcher queue")
-        while True:
-            await self.process_queue()
-            await asyncio.sleep(1)  # Wait for 60 seconds before checking the queue again
-
-    async def update_researched_elo_ratings(self):
-        ideas = list(self.researched_elo_ratings.keys())
-        if len(ideas) < 2:
-            print("Not enough researched ideas to compare.")
-            return
-        for i in range(len(ideas)):
-            for j in range(i + 1, len(ideas)):
-                await self.compare_researched_ideas(self.researched_ideas[ideas[i]], self.researched_ideas[ideas[j]])
-        
-        # After updating ELO ratings, send the best idea to the endpoint
-        print("Sending best idea after elo rating researched items")
-        await self.send_best_idea_to_endpoint()
+        await self.pipeline.run()
 
-    async def compare_researched_ideas(self, idea1, idea2):
-        # Sort ideas to ensure consistent cache key
-        sorted_ideas = tuple(sorted([idea1.idea_description, idea2.idea_description]))
-        cache_key = f"researched|{sorted_ideas[0]}|{sorted_ideas[1]}"
-
-        # Check if comparison result is in cache
-        if cache_key in self.comparison_cache:
-            result = self.comparison_cache[cache_key]
-            print(f"Using cached comparison result for researched ideas")
-        else:
-            comparison_prompt = f"""
-            Compare the following two researched business ideas based on these criteria:
-            {self.acceptance_criteria.get('free_text', '')}
-
-            Also, consider:
-            1. How realistic is it to satisfy the requirements?
-            2. What level of funding will be required and what kind of team members for it?
-            
-            Idea 1: {idea1.idea_description}
-            Research results 1: {idea1.research}
-
-            Idea 2: {idea2.idea_description}
-            Research results 2: {idea2.research}
-
-            Which idea is better? Respond with either "1" or "2".
-            """
+    async def _compare_researched_keys(self, description1, description2):
+        return await self.compare_researched_ideas(self.researched_ideas[description1], self.researched_ideas[description2])
 
-            response = await async_openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert business idea evaluator."},
-                    {"role": "user", "content": comparison_prompt},
-                ]
+    async def compare_researched_ideas(self, idea1, idea2):
+        # Present ideas in sorted order so (a, b) and (b, a) share one cached LLM response
+        first, second = sorted([idea1, idea2], key=lambda idea: idea.idea_description)
+        response = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="rank",
+            site="researched_compare",
+            messages=prompt_messages(
+                "researched_compare",
+                free_text=self.acceptance_criteria.get('free_text', ''),
+                first=first.idea_description,
+                first_research=self.research_summary(first),
+                second=second.idea_description,
+                second_research=self.research_summary(second),
             )
+        )
 
-            result = response.choices[0].message.content.strip()
-            
-            # Store the result in the cache
-            self.comparison_cache[cache_key] = result
-            print(f"Caching comparison result for researched ideas")
-
-        if "1" in result:
-            self.update_researched_elo(idea1.idea_description, idea2.idea_description, 1)
-        elif "2" in result:
-            self.update_researched_elo(idea2.idea_description, idea1.idea_description, 1)
-        else:
-            self.update_researched_elo(idea1.idea_description, idea2.idea_description, 0.5)
-
-    def update_researched_elo(self, winner, loser, score):
-        winner_rating = self.researched_elo_ratings[winner]
-        loser_rating = self.researched_elo_ratings[loser]
-
-        expected_winner = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
-        expected_loser = 1 - expected_winner
-
-        self.researched_elo_ratings[winner] += self.k_factor * (score - expected_winner)
-        self.researched_elo_ratings[loser] += self.k_factor * ((1 - score) - expected_loser)
+        result = response.choices[0].message.content.strip()
+        return self._score_for(idea1 is first, result)
 
     async def send_best_idea_to_endpoint(self):
         if not self.researched_ideas_queue:
@@ -285,11 +484,12 @@ class IdeaResearcher:
 
             for prioritized_item in sorted_ideas:
                 idea = prioritized_item.item
-                if idea.idea_description not in self.sent_ideas:
+                if idea.idea_description not in self.sent_ideas and idea.idea_description not in self.streaming_ideas:
                     idea_data = {
                         "idea": idea.idea_description,
                         "requirements": idea.requirements,
                         "research": idea.research,
+                        "compound_score": idea.research_score,
                         "elo_rating": self.researched_elo_ratings[idea.idea_description]
                     }
                     jsonl_data += json.dumps(idea_data) + "\n"
@@ -313,3 +513,25 @@ class IdeaResearcher:
             print(f"Error sending ideas to endpoint: {str(e)}")
 
         print("Finished sending ideas to the endpoint.")
+
+
+_COMPOUND_SCORE = re.compile(r"compound score\W{0,10}(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10", re.IGNORECASE)
+
+
+def parse_compound_score(text: str):
+    match = _COMPOUND_SCORE.search(text or "")
+    return float(match.group(1)) if match else None
+
+
+def parse_ranking(text: str, count: int) -> List[int]:
+    """
+    Zero-based indices from a "best to worst" list of 1-based idea numbers.
+    Numbers out of range or repeated are skipped; ideas the answer leaves out
+    go last, in the order they were presented.
+    """
+    order = []
+    for number in re.findall(r"\d+", text or ""):
+        index = int(number) - 1
+        if 0 <= index < count and index not in order:
+            order.append(index)
+    return order + [index for index in range(count) if index not in order]
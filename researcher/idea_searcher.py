@@ -1,13 +1,24 @@
+import argparse
 import asyncio
-import heapq
+import itertools
+import sys
 from dataclasses import dataclass, field
 from typing import Any, List, Tuple, Optional
 import json
-import random
-import threading
 import requests
-import aiohttp
-from idea_researcher import IdeaResearcher
+from idea_researcher import IdeaResearcher, parse_compound_score
+from admin_sync import ProcessedIdeasSync, processed_idea_to_json
+from batch_evaluator import BatchEvaluator
+from persona_sampler import PersonaSampler
+from pipeline import Pipeline
+from dedup import DedupIndex
+from frontier import Frontier
+from lineage import LineageStore
+from scheduler import make_scheduler_policy
+from checkpoint import Checkpointer
+from metrics import metrics
+from control_plane import ControlPlane, events
+from prompts import prompt_messages
 
 
 class bcolors:
@@ -22,25 +33,7 @@ class bcolors:
     UNDERLINE = '\033[4m'
 
 
-from flask import Flask, request, render_template, jsonify
-from flask_cors import CORS
-
-from datasets import load_dataset
-
-persona_hub = load_dataset("proj-persona/PersonaHub", "persona")['train']
-
-app = Flask(__name__)
-CORS(app)
-
-from openai import AsyncOpenAI
-async_openai = AsyncOpenAI()
-
-from honeyhive import HoneyHiveTracer, trace
-
-HoneyHiveTracer.init(
-    api_key='YmsydjFzdHB5cWQ4aHN2cjB2cTll',
-    project='OpenAI Hackathon',
-)
+from llm_client import llm_client
 
 idea_expand_tool = [
 {
@@ -135,48 +128,83 @@ idea_evaluation_tool = [
 ]
 
 
+# Scores the search and viability heuristics (plus any additional criteria) in one call
+idea_combined_evaluation_tool = [
+    {
+        "type": "function",
+        "function": {
+            "name": "evaluate_idea_combined",
+            "description": "Evaluate a business idea against the search criteria, its viability and any additional criteria.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "search_score": {
+                        "type": "number",
+                        "description": "A score from 1 to 5 indicating how well the idea matches the search criteria."
+                    },
+                    "viability_score": {
+                        "type": "number",
+                        "description": "A score from 1 to 5 indicating the idea's potential for success, scalability, and profitability."
+                    },
+                    "additional_scores": {
+                        "type": "array",
+                        "description": "One score per additional criterion, in the order given.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "criterion": {
+                                    "type": "string",
+                                    "description": "The additional criterion being scored."
+                                },
+                                "score": {
+                                    "type": "number",
+                                    "description": "A score from 1 to 5 indicating how well the idea meets the criterion."
+                                }
+                            },
+                            "required": ["criterion", "score"],
+                            "additionalProperties": False
+                        }
+                    },
+                    "explanation": {
+                        "type": "string",
+                        "description": "A brief explanation of the scores."
+                    }
+                },
+                "required": ["search_score", "viability_score", "additional_scores", "explanation"],
+                "additionalProperties": False
+            }
+        }
+    }
+]
+
+
 # Shared state object
 class SharedState:
+    """
+    Criteria set by the admin through the control plane; Idea.expand reads
+    the search criteria from here. Only the event loop touches it.
+    """
     def __init__(self):
-        self.lock = threading.Lock()
         self.search_criteria = ""
         self.acceptance_criteria = {}
 
     def update_search_criteria(self, new_criteria):
-        with self.lock:
-            self.search_criteria = new_criteria
+        self.search_criteria = new_criteria
 
     def update_acceptance_criteria(self, new_criteria):
-        with self.lock:
-            self.acceptance_criteria = new_criteria
+        self.acceptance_criteria = new_criteria
 
     def get_search_criteria(self):
-        with self.lock:
-            return self.search_criteria
+        return self.search_criteria
 
     def get_acceptance_criteria(self):
-        with self.lock:
-            return self.acceptance_criteria
+        return self.acceptance_criteria
         
     def set_search_criteria(self, new_criteria):
-        with self.lock:
-            self.search_criteria = str(new_criteria)
+        self.search_criteria = str(new_criteria)
 
 shared_state = SharedState()
 
-# Flask routes
-@app.route('/update_search_criteria', methods=['POST'])
-def update_search_criteria():
-    new_criteria = request.json.get('search_criteria')
-    shared_state.update_search_criteria(new_criteria)
-    return jsonify({"message": "Search criteria updated"}), 200
-
-@app.route('/update_acceptance_criteria', methods=['POST'])
-def update_acceptance_criteria():
-    new_criteria = request.json.get('acceptance_criteria')
-    shared_state.update_acceptance_criteria(new_criteria)
-    return jsonify({"message": "Acceptance criteria updated"}), 200
-
 
 # Placeholder for admin server interaction
 async def request_admin_approval(checkpoint: Any) -> bool:
@@ -191,20 +219,78 @@ class PrioritizedItem:
     item: Any=field(compare=False)
 
 class Idea:
+    """
+    A node in the search tree. Ideas are kept compact because the frontier and
+    lineages can hold tens of thousands of them: attributes live in __slots__,
+    search criteria strings are interned so every idea shares one copy,
+    requirements are appended as segments instead of re-concatenating one
+    string, and parent ids are also recorded in the shared LineageStore.
+    """
+    __slots__ = ("idea_id", "idea_description", "requirement_segments", "search_criteria",
+                 "parent", "depth", "research", "research_score", "research_digest", "criteria_version", "cached_scores")
+
+    _next_id = itertools.count()
+    lineage_store = LineageStore()
+
     def __init__(
         self, 
         idea_description: str, 
         search_criteria: dict, 
         parent: Optional['Idea'] = None, 
         requirements: str = "", 
-        depth: int = 0
+        depth: int = 0,
+        idea_id: Optional[int] = None
     ):
         self.idea_description = idea_description
-        self.requirements = requirements
-        self.search_criteria = search_criteria
+        self.requirement_segments = [requirements] if requirements else []
+        self.search_criteria = sys.intern(search_criteria) if isinstance(search_criteria, str) else search_criteria
         self.parent = parent
         self.depth = depth if parent is None else parent.depth + 1
-        self.idea_research = None
+        self.research = None
+        self.research_score = None
+        self.research_digest = None  # Short summary of the research, used by ranking prompts
+        # Criteria version of the score this idea's frontier priority was derived from
+        self.criteria_version = parent.criteria_version if parent is not None else 0
+        self.cached_scores = None  # (criteria version, scores) from a re-score, used instead of evaluating again
+        self.idea_id = next(Idea._next_id) if idea_id is None else idea_id
+        Idea.lineage_store.add(self.idea_id, parent.idea_id if parent is not None else None)
+
+    @property
+    def requirements(self) -> str:
+        return "".join(self.requirement_segments)
+
+    @requirements.setter
+    def requirements(self, value: str):
+        self.requirement_segments = [value] if value else []
+
+    @classmethod
+    def from_record(cls, idea_id: int, record: dict, parent: Optional['Idea'] = None) -> 'Idea':
+        """
+        Rebuilds an idea saved by the checkpointer, keeping its id.
+        """
+        # Make sure new ideas never reuse a restored id
+        cls._next_id = itertools.count(max(idea_id + 1, next(cls._next_id)))
+        idea = cls(record['idea_description'], record['search_criteria'], parent=parent,
+                   requirements=record['requirements'], idea_id=idea_id)
+        idea.depth = record['depth']
+        idea.research = record['research']
+        # Checkpoints written before the score was saved only have the report to parse it from
+        idea.research_score = record['research_score'] if 'research_score' in record else parse_compound_score(idea.research)
+        idea.research_digest = record.get('research_digest')
+        return idea
+
+    def lineage(self) -> List['Idea']:
+        """
+        This idea followed by its ancestors, root last.
+        """
+        lineage, node = [], self
+        while node is not None:
+            lineage.append(node)
+            node = node.parent
+        return lineage
+
+    def lineage_ids(self) -> List[int]:
+        return list(Idea.lineage_store.ancestors(self.idea_id))
 
     async def expand(self) -> List['Idea']:
         """
@@ -213,12 +299,11 @@ class Idea:
         """
         print('Search Criteria:', shared_state.get_search_criteria())
         # Simulate processing delay
-        oai_call = await async_openai.chat.completions.create(
+        oai_call = await llm_client.chat_completion(
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Please provide 3 similar business ideas based on what the user says. The search criteria we are interested in is: " + str(shared_state.get_search_criteria())},
-                {"role": "user", "content": "Here's my idea: " + self.idea_description + "\n\n Can you give a similar business idea?"},
-            ],
+            lane="expand",
+            site="expand",
+            messages=prompt_messages("expand", search_criteria=shared_state.get_search_criteria(), idea=self.idea_description),
             tools=idea_expand_tool
         )
         expanded_description = oai_call.choices[0].message.tool_calls[0]
@@ -236,12 +321,11 @@ class Idea:
         """
         goal = self.idea_description
         
-        oai_call = await async_openai.chat.completions.create(
+        oai_call = await llm_client.chat_completion(
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "For this business goal, create a list of 3 high level things we need to make it happen. Be more descriptive and build upon any existing requirements."},
-                {"role": "user", "content": f"Here's the goal: {goal}\nExisting requirements: {self.requirements}"},
-            ],
+            lane="expand",
+            site="requirements",
+            messages=prompt_messages("requirements", goal=goal, requirements=self.requirements),
             tools=idea_requirement_tool
         )
         expanded_requirement = oai_call.choices[0].message.tool_calls[0]
@@ -250,146 +334,282 @@ class Idea:
         
         # Append new requirements to existing ones
         for req in new_requirements:
-            self.requirements += f"\n- {req['idea_requirement']}"
+            self.requirement_segments.append(f"\n- {req['idea_requirement']}")
         self.depth += 1
 
     def print_lineage(self, indent: str = "") -> None:
-        print(f"{indent}{self.idea_description}")
-        if self.parent:
-            self.parent.print_lineage(indent + "  ")
+        for level, idea in enumerate(self.lineage()):
+            print(f"{indent}{'  ' * level}{idea.idea_description}")
 
 class IdeaSearcher:
-    def __init__(self, search_criteria: str, acceptance_criteria: dict, shared_state: SharedState):
+    def __init__(self, search_criteria: str, acceptance_criteria: dict, shared_state: SharedState, checkpoint_dir: str = "checkpoints"):
         self.shared_state = shared_state
         self.search_criteria = search_criteria
         self.acceptance_criteria = acceptance_criteria
-        self.priority_queue: List[PrioritizedItem] = []
         self.accepted_ideas: List[Tuple[Idea, dict]] = []
         self.processed_ideas: List[Tuple[Idea, dict]] = []
         self.lock = asyncio.Lock()
+        self.criteria_version = 0  # Bumped on every search or acceptance criteria update
+        self.rescore_task = None
         self.paused = asyncio.Event()
         self.paused.set()  # Initially not paused
 
         # Hyperparameters as class attributes
-        self.batch_size_factor = 3  # Controls the batch size relative to queue size
-        self.max_batch_size = 5  # Maximum number of ideas to process in parallel
+        self.stage_workers = {"evaluate": 5, "expand": 3, "requirements": 3}  # Workers per pipeline stage
+        self.stage_queue_size = 10  # Bound on each stage's queue; producers block when it is full
+        self.seed_threshold = 3  # Generate seed ideas when this few ideas are left in the search stages
+        self.dedup_threshold = 0.85  # Embedding cosine similarity at which a new idea counts as a near-duplicate
         self.depth_limit = 2  # Maximum depth of idea expansion
         self.requirement_expansion_depth = 1  # Depth at which to start expanding requirements
         self.expansion_priority_penalty = 1.0  # Priority penalty for expanded ideas
         self.requirement_priority_penalty = 0.1  # Priority penalty for requirement expansion
         self.priority_jitter_range = 0.1  # Range of random jitter added to priorities
+        self.scheduler_policy = "ucb"  # "ucb" learns where to spend expansions, "fixed_penalty" uses the penalties above
+        self.scheduler_exploration = 0.5  # UCB exploration weight
+        self.frontier_max_size = 200  # Most ideas kept waiting; the lowest-priority ones are evicted
+        self.frontier_beam_width = 50  # Most ideas kept waiting at any one depth (None for no limit)
+        self.frontier_depth_bonus = 0.5  # Priority bonus for ideas at depth_limit, scaled down to 0 at requirement_expansion_depth - 1
+        self.combined_evaluation = True  # Score both heuristics in one call instead of two
+        self.batched_evaluation = True  # Score several ideas per call (implies combined evaluation)
+        self.seed_persona_count = 3  # Number of personas to generate seed ideas for when the queue runs low
+        self.seed_ideas_per_persona = 3  # Number of seed ideas requested per persona
+
+        scheduler_options = {
+            "fixed_penalty": {
+                "expansion_priority_penalty": self.expansion_priority_penalty,
+                "requirement_priority_penalty": self.requirement_priority_penalty,
+                "priority_jitter_range": self.priority_jitter_range,
+            },
+            "ucb": {"exploration": self.scheduler_exploration},
+        }
+        self.scheduler = make_scheduler_policy(
+            self.scheduler_policy,
+            depth_limit=self.depth_limit,
+            requirement_expansion_depth=self.requirement_expansion_depth,
+            **scheduler_options.get(self.scheduler_policy, {})
+        )
+        self.frontier = Frontier(
+            max_size=self.frontier_max_size,
+            beam_width=self.frontier_beam_width,
+            depth_bonus=self.frontier_depth_bonus,
+            depth_limit=self.depth_limit,
+            requirement_expansion_depth=self.requirement_expansion_depth,
+        )
 
-        # New class attributes for prompts
-        self.search_heuristic_prompt = """You are an expert business idea evaluator. Evaluate the given idea based on the provided criteria. Use a scale from 1 to 5, where 1 is the lowest and 5 is the highest."""
-        
-        self.viability_heuristic_prompt = """You are an expert business viability evaluator. Evaluate the given idea based on its potential for success, scalability, and profitability. Use a scale from 1 to 5, where 1 is the lowest and 5 is the highest."""
-
-        self.idea_researcher = IdeaResearcher(acceptance_criteria)
+        # expand / evaluate / requirements stages here, research / rank stages in the researcher
+        self.frontier_ready = asyncio.Event()
+        self.pipeline = Pipeline()
+        self.pipeline.add_stage("evaluate", self.process_single_idea, self.stage_workers["evaluate"], self.stage_queue_size)
+        self.pipeline.add_stage("expand", self.expand_stage, self.stage_workers["expand"], self.stage_queue_size)
+        self.pipeline.add_stage("requirements", self.requirements_stage, self.stage_workers["requirements"], self.stage_queue_size)
+        self.idea_researcher = IdeaResearcher(acceptance_criteria, pipeline=self.pipeline)
+        self.admin_sync = ProcessedIdeasSync(self.processed_ideas)
+        self.batch_evaluator = BatchEvaluator(self)
+        self.persona_sampler = PersonaSampler()
+        self.dedup_index = DedupIndex(threshold=self.dedup_threshold)
+        self.rescore_top_k = 50  # Best frontier ideas re-scored eagerly after a criteria update; the rest are re-scored when popped
+        self.rescore_batches = 4  # Evaluation batches re-scored at a time after a criteria update
+        self.checkpoint_interval = 30  # Seconds between incremental checkpoints
+        self.checkpointer = Checkpointer(self, directory=checkpoint_dir, interval=self.checkpoint_interval)
+        self.metrics_snapshot_path = "metrics.json"  # Periodic JSON snapshot of the metrics registry; None disables it
+        self.metrics_snapshot_interval = 15  # Seconds between metrics snapshots
+        self.control_plane_port = 7000  # Port for the admin API; None disables it
+        self.control_plane = ControlPlane(self, port=self.control_plane_port)
+
+        metrics.gauge("frontier_size", lambda: len(self.frontier))
+        metrics.gauge("frontier_evicted", lambda: self.frontier.evicted)
+        metrics.gauge("processed_ideas", lambda: len(self.processed_ideas))
+        metrics.gauge("duplicates_rejected", lambda: self.dedup_index.rejected)
+        metrics.gauge("criteria_version", lambda: self.criteria_version)
     
     def add_idea(self, idea: Idea, priority: float):
-        heapq.heappush(self.priority_queue, PrioritizedItem(priority, idea))
-        # print(f"Idea added to queue with priority {priority}:\n\n {idea.idea_description} \n\n")
+        self.frontier.push(idea, priority)
+        self.frontier_ready.set()
+
+    async def filter_duplicates(self, ideas: List[Idea]) -> List[Idea]:
+        """
+        Records ideas in the dedup index, embedding them in one request, and
+        returns those that are not near-duplicates of an idea already seen or
+        of one earlier in the list.
+        """
+        if not ideas:
+            return []
+        embeddings = await llm_client.embed([idea.idea_description for idea in ideas])
+        admitted = []
+        for idea, embedding in zip(ideas, embeddings):
+            is_new, match, similarity = self.dedup_index.admit(idea.idea_description, embedding)
+            if is_new:
+                admitted.append(idea)
+            else:
+                print(f"Skipping near-duplicate idea (similarity {similarity:.2f} to '{match}'): {idea.idea_description}")
+        return admitted
+
+    async def admit_ideas(self, ideas: List[Idea], priority: float) -> List[Idea]:
+        """
+        Adds newly generated ideas, except near-duplicates. Returns those admitted.
+        """
+        admitted = await self.filter_duplicates(ideas)
+        for idea in admitted:
+            self.add_idea(idea, priority)
+        return admitted
 
     async def update_search_criteria(self, new_criteria: str):
-        self.search_criteria = new_criteria
+        async with self.lock:
+            self.search_criteria = new_criteria
+            self.shared_state.update_search_criteria(new_criteria)
+            self.criteria_version += 1
+            self.schedule_rescore()
+        print("Search criteria updated to:", self.search_criteria)
+        events.publish("search_criteria", {"search_criteria": new_criteria, "criteria_version": self.criteria_version})
 
     async def update_acceptance_criteria(self, new_criteria: dict):
         async with self.lock:
-            self.paused.clear()  # Pause the queue
             self.acceptance_criteria = new_criteria
-            # await self.recompute_priorities()
+            self.shared_state.update_acceptance_criteria(new_criteria)
+            self.criteria_version += 1
             # Update the IdeaResearcher's acceptance criteria
             await self.idea_researcher.update_acceptance_criteria(new_criteria)
-            self.paused.set()  # Resume the queue
+            self.schedule_rescore()
+        print("Acceptance criteria updated to:", self.acceptance_criteria)
+        events.publish("acceptance_criteria", {"acceptance_criteria": new_criteria, "criteria_version": self.criteria_version})
 
-    async def recompute_priorities(self):
-        new_queue = []
-        tasks = []
-        
-        while self.priority_queue:
-            prioritized_item = heapq.heappop(self.priority_queue)
-            idea = prioritized_item.item
-            tasks.append(self._recompute_priority_for_idea(idea, new_queue))
-        
-        await asyncio.gather(*tasks)
-        self.priority_queue = new_queue
+    def schedule_rescore(self):
+        # A running re-score takes a fresh snapshot for the new version once its current batches finish
+        if self.rescore_task is None or self.rescore_task.done():
+            self.rescore_task = asyncio.create_task(self.recompute_priorities())
+
+    def rescored_priority(self, idea: Idea, combined_score: float) -> float:
+        # A re-scored idea goes back on the frontier itself, as after a requirements expansion
+        return self.scheduler.priority(idea, combined_score, "requirements")
 
-    async def _recompute_priority_for_idea(self, idea, new_queue):
-        search_score = await self.evaluate_search_heuristic(idea)
-        viability_score = await self.evaluate_viability_heuristic(idea)
-        new_priority = (search_score + viability_score) / 2
-        heapq.heappush(new_queue, PrioritizedItem(new_priority, idea))
+    async def recompute_priorities(self):
+        """
+        Eagerly re-scores the stale ideas in one snapshot of the rescore_top_k
+        best on the frontier, i.e. those whose priority was derived under older
+        criteria, rescore_batches batches at a time. The frontier keeps being
+        served meanwhile. Ideas that move into the top K afterwards, and stale
+        ideas further down, are re-scored lazily when popped (see
+        _process_single_idea). If the criteria change again during the pass, a
+        fresh snapshot is taken for the new version.
+        """
+        while True:
+            version = self.criteria_version
+            stale = [idea for _, idea in self.frontier.top(self.rescore_top_k) if idea.criteria_version != version]
+            chunks = self.batch_evaluator.chunk(stale)
+            rescored = 0
+            for start in range(0, len(chunks), self.rescore_batches):
+                if self.criteria_version != version:
+                    break
+                # Ideas popped since the snapshot are re-scored by the evaluate stage instead
+                ideas = [idea for chunk in chunks[start:start + self.rescore_batches] for idea in chunk
+                         if idea.idea_id in self.frontier]
+                if not ideas:
+                    continue
+                try:
+                    if self.batched_evaluation:
+                        all_scores = await self.batch_evaluator.evaluate_many(ideas)
+                    else:
+                        all_scores = await asyncio.gather(*(self.evaluate_heuristics(idea) for idea in ideas))
+                except Exception as e:
+                    print(bcolors.FAIL + f"Error re-scoring the frontier: {e!r}" + bcolors.ENDC)
+                    return
+
+                for idea, scores in zip(ideas, all_scores):
+                    combined_score = (scores['search_score'] + scores['viability_score']) / 2
+                    # Ideas popped while the scores were computed stay popped
+                    if self.frontier.update(idea, self.rescored_priority(idea, combined_score)):
+                        idea.criteria_version = version
+                        idea.cached_scores = (version, scores)
+                        rescored += 1
+            print(f"Re-scored {rescored} of {len(stale)} stale top frontier ideas for criteria version {version}")
+            if self.criteria_version == version:
+                return
 
     async def process_queue(self):
-        # TODO generate seeds the first time
-        while self.priority_queue:
-            if self.shared_state.get_search_criteria() != self.search_criteria:
-                await self.update_search_criteria(self.shared_state.get_search_criteria())
-                print("Search criteria updated to:", self.search_criteria)
-            
+        """
+        Feeds the pipeline's evaluate stage from the priority queue.
+        Blocks while the evaluate stage is full, so downstream backpressure
+        reaches the frontier instead of piling up work in flight. Once the LLM
+        budget is spent it stops seeding, and returns when the search stages
+        have drained.
+        """
+        budget_warned = False
+        while True:
             await self.paused.wait()  # Wait if paused
-            
-            if len(self.priority_queue) <= 3:
+            # Cleared before the checks, so a stage finishing meanwhile still wakes the wait below
+            self.frontier_ready.clear()
+            in_search = len(self.frontier) + self.pipeline.pending("evaluate", "expand", "requirements")
+
+            if llm_client.budget.exhausted:
+                if not budget_warned:
+                    print(bcolors.WARNING + f"LLM budget spent ({llm_client.budget.stats()}), no new ideas will be generated" + bcolors.ENDC)
+                    budget_warned = True
+                if not in_search:
+                    print("Search stages drained with the LLM budget spent, stopping the frontier feeder")
+                    return
+            elif in_search <= self.seed_threshold:
                 seed_ideas = await self.generate_seed_ideas()
                 print("Generated seed ideas")
                 for idea in seed_ideas:
                    print("SEED IDEA:\n", idea.idea_description)
-                   self.add_idea(idea, 4)
-             
-            # Print the current queue size
-            print(f"\nCurrent queue size: {len(self.priority_queue)}")
-            
-            # Process multiple ideas in parallel
-            queue_size = len(self.priority_queue)
-            batch_size = min(self.max_batch_size, queue_size // self.batch_size_factor)
-            tasks = []
-            
-            for _ in range(min(1, queue_size)):
-                if len(self.priority_queue) == 1:
+                await self.admit_ideas(seed_ideas, 4)
+
+            if not self.frontier:
+                # Wait for expansions to refill the queue (or, with budget left, time out and reseed)
+                timeout = None if llm_client.budget.exhausted else 5
+                try:
+                    await asyncio.wait_for(self.frontier_ready.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
                     pass
-                # Print the current queue size
-                print(f"\nCurrent queue size: {len(self.priority_queue)}")
-                prioritized_item = heapq.heappop(self.priority_queue)
-                tasks.append(self.process_single_idea(prioritized_item))
-                
-            
-            await asyncio.gather(*tasks)
-            # send batch to admin using POST /processed_ideas
-            async with aiohttp.ClientSession() as session:
-                processed_ideas_json = []
-                for idea, scores in self.processed_ideas:
-                    try:
-                        idea_json = {
-                            "idea_description": idea.idea_description,
-                            "requirements": idea.requirements,
-                            "search_score": scores['search_score'],
-                            "viability_score": scores['viability_score']
-                        }
-                        processed_ideas_json.append(idea_json)
-                    except AttributeError as e:
-                        print(f"Error parsing idea: {e}")
-                        continue
-
-                async with session.post('http://localhost:9000/processed_ideas', json={"processed_ideas": processed_ideas_json}) as response:
-                    if response.status == 200:
-                        print("Successfully sent processed ideas to the admin.")
-                    else:
-                        print(f"Failed to send processed ideas. Status code: {response.status}")
+                continue
+
+            priority, idea = self.frontier.pop()
+            await self.pipeline.put("evaluate", PrioritizedItem(priority, idea))
+
+            # Print the current queue size
+            print(f"\nCurrent queue size: {len(self.frontier)}\tStage depths: {self.pipeline.depths()}")
+            self.admin_sync.notify()
 
     async def process_single_idea(self, prioritized_item):
+        """
+        Evaluate stage: scores an idea and routes it to the expand,
+        requirements or research stage.
+        """
+        try:
+            await self._process_single_idea(prioritized_item)
+        finally:
+            # Let the feeder re-check whether the search stages have drained and need reseeding
+            self.frontier_ready.set()
+
+    async def _process_single_idea(self, prioritized_item):
         idea = prioritized_item.item
         print(bcolors.OKGREEN + '\n\n----------------PROCESSING IDEA------------------')
         print(f"Idea:{idea.idea_description}\nPriority:{prioritized_item.priority}\nLineage:{idea.print_lineage()}")
         
-        # Evaluate heuristics concurrently
-        search_score, viability_score = await asyncio.gather(
-            self.evaluate_search_heuristic(idea),
-            self.evaluate_viability_heuristic(idea)
-        )
+        version = self.criteria_version
+        stale = idea.criteria_version != version
+        cached, idea.cached_scores = idea.cached_scores, None
+        if cached is not None and cached[0] == version:
+            scores = dict(cached[1])
+        else:
+            scores = await self.evaluate_heuristics(idea)
+        scores['criteria_version'] = version
+        idea.criteria_version = version
+        search_score, viability_score = scores['search_score'], scores['viability_score']
         combined_score = (search_score + viability_score) / 2
 
         print(f"Heuristics:\tSearch: {search_score}\tViability: {viability_score}\tCombined: {combined_score}")
 
+        # Lazy re-score: an idea popped on a stale priority goes back if it is no longer the best
+        if stale and self.frontier:
+            best_priority, best_idea = self.frontier.peek()
+            new_priority = self.rescored_priority(idea, combined_score)
+            if self.frontier.sort_key(new_priority, idea) < self.frontier.sort_key(best_priority, best_idea):
+                print(f"Re-scored on pop, back on the frontier at {new_priority}: {idea.idea_description}")
+                idea.cached_scores = (version, scores)
+                self.add_idea(idea, new_priority)
+                return
+
         # Check if checkpoint is reached for admin approval
         if combined_score < self.acceptance_criteria.get('threshold', 5):
             approved = await request_admin_approval(idea)
@@ -397,47 +617,97 @@ class IdeaSearcher:
                 return
 
         # Check acceptance criteria
-        self.processed_ideas.append((idea, {'search_score': search_score, 'viability_score': viability_score}))
+        self.processed_ideas.append((idea, scores))
+        events.publish("processed_idea", processed_idea_to_json(len(self.processed_ideas) - 1, idea, scores))
+        self.scheduler.record_evaluation(idea, combined_score)
 
-        # Count the number of parents
-        parent_count = idea.depth
-
-        # Decide whether to expand the idea or expand requirements
-        if parent_count >= self.depth_limit:
+        # Decide whether to expand the idea, expand its requirements or research it
+        action = self.scheduler.choose_action(idea, combined_score)
+        if action == "research":
             print(f"\n\nIdea has hit depth limit: {idea.idea_description}\n\n")
             await self.idea_researcher.add_idea(idea, combined_score)
-        elif parent_count >= self.requirement_expansion_depth:
-            # Expand requirements
-            print('EXPANDING REQUIREMENTS')
-            print('----------------------------------\n')
-            print(bcolors.ENDC)
-            await idea.expand_requirements()
-            
-            # Re-add the idea to the queue with a slightly lower priority and jitter
-            jitter = random.uniform(-self.priority_jitter_range/2, self.priority_jitter_range/2)
-            new_priority = combined_score - self.requirement_priority_penalty + jitter
-            self.add_idea(idea, new_priority)
+        elif llm_client.budget.exhausted:
+            print(f"LLM budget spent, not expanding: {idea.idea_description}")
         else:
-            # Expand the idea and add back to the queue
-            print('EXPANDING IDEA')
-            print('----------------------------------\n')
-            print(bcolors.ENDC)
-            expanded_ideas = await idea.expand()
-            jitter = random.uniform(-self.priority_jitter_range, self.priority_jitter_range)
-            new_priority = combined_score - self.expansion_priority_penalty + jitter
-            for expanded_idea in expanded_ideas:
-                self.add_idea(expanded_idea, new_priority)
+            await self.pipeline.put(action, (idea, combined_score))
+
+    async def requirements_stage(self, item):
+        idea, combined_score = item
+        print('EXPANDING REQUIREMENTS')
+        print('----------------------------------\n')
+        print(bcolors.ENDC)
+        await idea.expand_requirements()
+        
+        # Re-add the idea to the queue at the priority the scheduler gives it
+        new_priority = self.scheduler.priority(idea, combined_score, "requirements")
+        self.scheduler.record_action(idea, combined_score, "requirements", [idea])
+        self.add_idea(idea, new_priority)
+
+    async def expand_stage(self, item):
+        idea, combined_score = item
+        print('EXPANDING IDEA')
+        print('----------------------------------\n')
+        print(bcolors.ENDC)
+        expanded_ideas = await idea.expand()
+        new_priority = self.scheduler.priority(idea, combined_score, "expand")
+        admitted = await self.admit_ideas(expanded_ideas, new_priority)
+        self.scheduler.record_action(idea, combined_score, "expand", admitted)
+        self.frontier_ready.set()  # Even if every child was a duplicate
+
+    async def evaluate_heuristics(self, idea: Idea) -> dict:
+        """
+        Score the search and viability heuristics, either in one combined call
+        or with the original two calls depending on self.combined_evaluation.
+        With self.batched_evaluation, concurrent callers share batched requests.
+        """
+        if self.batched_evaluation:
+            return await self.batch_evaluator.evaluate(idea)
+        if self.combined_evaluation:
+            return await self.evaluate_combined_heuristics(idea)
+        # Evaluate heuristics concurrently
+        search_score, viability_score = await asyncio.gather(
+            self.evaluate_search_heuristic(idea),
+            self.evaluate_viability_heuristic(idea)
+        )
+        return {'search_score': search_score, 'viability_score': viability_score}
+
+    async def evaluate_combined_heuristics(self, idea: Idea) -> dict:
+        """
+        Evaluate the search and viability heuristics, and any additional acceptance criteria, in one OpenAI call.
+        """
+        free_text_criteria = self.acceptance_criteria.get('free_text', '')
+        additional_criteria = self.acceptance_criteria.get('additional_criteria', [])
+
+        oai_call = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="evaluate",
+            site="combined_heuristic",
+            messages=prompt_messages(
+                "combined_heuristic",
+                search_criteria=self.search_criteria,
+                free_text=free_text_criteria,
+                additional_criteria=json.dumps(additional_criteria),
+                idea=idea.idea_description,
+                requirements=idea.requirements,
+            ),
+            tools=idea_combined_evaluation_tool,
+            tool_choice={"type": "function", "function": {"name": "evaluate_idea_combined"}}
+        )
+        result = json.loads(oai_call.choices[0].message.tool_calls[0].function.arguments)
+        scores = {'search_score': result['search_score'], 'viability_score': result['viability_score']}
+        if result['additional_scores']:
+            scores['additional_scores'] = {item['criterion']: item['score'] for item in result['additional_scores']}
+        return scores
 
     async def evaluate_search_heuristic(self, idea: Idea) -> float:
         """
         Evaluate the idea using OpenAI based on the search criteria.
         """
-        oai_call = await async_openai.chat.completions.create(
+        oai_call = await llm_client.chat_completion(
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": self.search_heuristic_prompt},
-                {"role": "user", "content": f"Search Criteria: {self.search_criteria}\n\nIdea: {idea.idea_description}"},
-            ],
+            lane="evaluate",
+            site="search_heuristic",
+            messages=prompt_messages("search_heuristic", search_criteria=self.search_criteria, idea=idea.idea_description),
             tools=idea_evaluation_tool
         )
         evaluation = oai_call.choices[0].message.tool_calls
@@ -454,12 +724,13 @@ class IdeaSearcher:
         """
         free_text_criteria = self.acceptance_criteria.get('free_text', '')
         
-        oai_call = await async_openai.chat.completions.create(
+        oai_call = await llm_client.chat_completion(
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": self.viability_heuristic_prompt},
-                {"role": "user", "content": f"Idea: {idea.idea_description}\n\nIdea Requirements: {idea.requirements}\n\nAdditional Criteria: {free_text_criteria}"},
-            ],
+            lane="evaluate",
+            site="viability_heuristic",
+            messages=prompt_messages(
+                "viability_heuristic", free_text=free_text_criteria, idea=idea.idea_description, requirements=idea.requirements
+            ),
             tools=idea_evaluation_tool
         )
         evaluation = oai_call.choices[0].message.tool_calls
@@ -471,10 +742,27 @@ class IdeaSearcher:
         return final_score // num_scores
 
     async def search(self):
-        async with self.lock:
-            start_processing_task = asyncio.create_task(self.idea_researcher.start_processing())
-            process_queue_task = asyncio.create_task(self.process_queue())
-            await asyncio.gather(start_processing_task, process_queue_task)
+        if self.control_plane_port is not None:
+            await self.control_plane.start()
+        # The pipeline runs the researcher's stages too
+        pipeline_task = asyncio.create_task(self.pipeline.run())
+        admin_sync_task = asyncio.create_task(self.admin_sync.run())
+        checkpoint_task = asyncio.create_task(self.checkpointer.run())
+        process_queue_task = asyncio.create_task(self.process_queue())
+        requeue_task = asyncio.create_task(self.checkpointer.requeue_restored())
+        metrics_task = None
+        if self.metrics_snapshot_path:
+            metrics_task = asyncio.create_task(metrics.run_snapshots(self.metrics_snapshot_path, self.metrics_snapshot_interval))
+        try:
+            await asyncio.gather(pipeline_task, process_queue_task, requeue_task)
+        finally:
+            admin_sync_task.cancel()
+            checkpoint_task.cancel()
+            if metrics_task:
+                metrics_task.cancel()
+            await self.control_plane.stop()
+            if llm_client.cache is not None:
+                await llm_client.cache.flush()
 
     def get_accepted_ideas(self) -> List[Tuple[Idea, dict]]:
         return self.accepted_ideas
@@ -485,30 +773,53 @@ class IdeaSearcher:
     async def generate_seed_ideas(self):
         """
         Generates new seed ideas using persona hub + search criteria.
+        One request per persona, all sent concurrently.
         """
-        persona_hub_shuffle = persona_hub.shuffle()
-        personas = persona_hub_shuffle['persona'][:3]
+        # The first call loads the dataset, so keep it off the event loop
+        personas = await asyncio.to_thread(self.persona_sampler.sample, self.seed_persona_count)
+        results = await asyncio.gather(
+            *(self.generate_seed_ideas_for_persona(persona) for persona in personas),
+            return_exceptions=True
+        )
+        expanded_ideas = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(bcolors.FAIL + f"Error generating seed ideas: {result!r}" + bcolors.ENDC)
+                continue
+            expanded_ideas.extend(result)
+        return expanded_ideas
+
+    async def generate_seed_ideas_for_persona(self, persona: str) -> List[Idea]:
+        oai_call = await llm_client.chat_completion(
+            model="gpt-4o-mini",
+            lane="expand",
+            site="seed",
+            messages=prompt_messages(
+                "seed", search_criteria=self.search_criteria, persona=persona, count=self.seed_ideas_per_persona
+            ),
+            tools=idea_expand_tool
+        )
+        expanded_description = oai_call.choices[0].message.tool_calls[0]
+        arguments = json.loads(expanded_description.function.arguments)
+        ideas = arguments['ideas']
         expanded_ideas = []
-        for persona in personas:
-            oai_call = await async_openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant. Please generate 3 business ideas for the given persona provided the search criteria. The search criteria we are interested in is: " + str(self.search_criteria)},
-                    {"role": "user", "content": "Here's the prospective persona: " + persona + "\n\n Can you give a business idea for them?"},
-                ],
-                tools=idea_expand_tool
-            )
-            expanded_description = oai_call.choices[0].message.tool_calls[0]
-            arguments = json.loads(expanded_description.function.arguments)
-            ideas = arguments['ideas']
-            expanded_ideas = []
-            for idea in ideas:
-                expanded_description = idea['idea_description']
-                expanded_ideas.append(Idea(expanded_description, self.search_criteria, parent=None))
+        for idea in ideas:
+            expanded_description = idea['idea_description']
+            seed_idea = Idea(expanded_description, self.search_criteria, parent=None)
+            seed_idea.criteria_version = self.criteria_version
+            expanded_ideas.append(seed_idea)
         return expanded_ideas
 
 # Example Usage
-async def main(shared_state):
+async def main(shared_state, resume: bool = False, checkpoint_dir: str = "checkpoints"):
+    # Tracing is set up here rather than at import, so importing this module (e.g. from benchmark.py) stays offline
+    from honeyhive import HoneyHiveTracer
+
+    HoneyHiveTracer.init(
+        api_key='YmsydjFzdHB5cWQ4aHN2cjB2cTll',
+        project='OpenAI Hackathon',
+    )
+
     # Define search criteria as a natural language description
     search_criteria = """
     We are seeking groundbreaking business ideas that meet the following criteria:
@@ -532,17 +843,20 @@ async def main(shared_state):
     }
 
     # Initialize IdeaSearcher
-    searcher = IdeaSearcher(search_criteria, acceptance_criteria, shared_state)
+    searcher = IdeaSearcher(search_criteria, acceptance_criteria, shared_state, checkpoint_dir=checkpoint_dir)
+
+    # Rebuild queues, lineage and rankings from the last checkpoint instead of starting over
+    resumed = resume and await searcher.checkpointer.restore(Idea.from_record)
 
     # Add initial ideas
-    initial_ideas = [
+    initial_ideas = [] if resumed else [
         Idea("Help Captain Jack Sparrow start a B2B SaaS business in San Francisco", {})
     ]
 
     for idea in initial_ideas:
         # Assign initial priority based on viability heuristic
         priority = await searcher.evaluate_viability_heuristic(idea)
-        searcher.add_idea(idea, priority)
+        await searcher.admit_ideas([idea], priority)
 
     # Start the search process in a separate task
     search_task = asyncio.create_task(searcher.search())
@@ -581,11 +895,8 @@ async def main(shared_state):
         print()  # Add an extra newline for readability
 
 
-def run_flask():
-    app.run(debug=True, use_reloader=False, port=7000)
-
-def run_asyncio_main():
-    asyncio.run(main(shared_state))
+def run_asyncio_main(resume: bool = False, checkpoint_dir: str = "checkpoints"):
+    asyncio.run(main(shared_state, resume=resume, checkpoint_dir=checkpoint_dir))
 
 def send_idea():
     try:
@@ -594,21 +905,12 @@ def send_idea():
     except requests.RequestException as e:
         return f"Error: {str(e)}", 500
 
-@app.route('/feedback', methods=['POST'])
-def feedback():
-    body = request.get_json()
-    print("Received feedback:", body['feedback'])
-    shared_state.set_search_criteria(body['feedback'])
-    return {"message": "Feedback received"}, 200
-
 # Run the example
 if __name__ == "__main__":
-    # Start Flask in a separate thread
-    flask_thread = threading.Thread(target=run_flask)
-    flask_thread.start()
-
-    # Run the asyncio main function in the main thread
-    run_asyncio_main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="Resume the search from the last checkpoint")
+    parser.add_argument("--checkpoint-dir", default="checkpoints", help="Directory for search checkpoints")
+    args = parser.parse_args()
 
-    # Wait for the Flask thread to finish (which it never will in this case)
-    flask_thread.join()
\ No newline at end of file
+    # The admin API runs on the same event loop as the search
+    run_asyncio_main(resume=args.resume, checkpoint_dir=args.checkpoint_dir)
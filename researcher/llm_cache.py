@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+class LLMCache:
+    """
+    Bounded cache for LLM responses keyed by a hash of the request.
+
+    Entries live in an in-memory LRU capped at max_bytes and optionally expire
+    after ttl seconds. When db_path is given, entries are also written to a
+    SQLite file so a restarted run starts warm. Writes are queued and committed
+    in batches from a worker thread, so set() never blocks the event loop on
+    disk; call flush() before exiting to keep the last batch.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created_at, value)
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        self.db_lock = threading.Lock()  # The connection is shared by the event loop and the writer thread
+        self.pending_writes: List[Tuple[str, tuple]] = []  # (statement, parameters) not yet committed
+        self.write_task: Optional[asyncio.Task] = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created_at REAL)")
+            self.db.commit()
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        """
+        Hashes the model, messages, tool schema and any other request parameters.
+        """
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None and self.db is not None:
+            with self.db_lock:
+                row = self.db.execute("SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                entry = (row[0], row[1])
+                self._store(key, entry)
+        if entry is None or self._expired(entry[0]):
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: str):
+        entry = (time.time(), value)
+        self._store(key, entry)
+        if self.db is not None:
+            self._queue_write("INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)", (key, value, entry[0]))
+
+    def delete(self, key: str):
+        self._evict(key)
+
+    async def flush(self):
+        """
+        Commits the queued writes, one transaction per batch, in a worker thread.
+        """
+        while self.pending_writes:
+            writes, self.pending_writes = self.pending_writes, []
+            try:
+                await asyncio.to_thread(self._write, writes)
+            except sqlite3.Error as e:
+                # The in-memory cache still has the entries; only a warm restart loses them
+                print(f"Error writing {len(writes)} LLM cache entries: {e!r}")
+
+    def _queue_write(self, statement: str, parameters: tuple):
+        self.pending_writes.append((statement, parameters))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to block, e.g. in a script; write straight away
+            writes, self.pending_writes = self.pending_writes, []
+            self._write(writes)
+            return
+        # Writes queued while a batch is being committed go out in the next one
+        if self.write_task is None or self.write_task.done():
+            self.write_task = loop.create_task(self.flush())
+
+    def _write(self, writes: List[Tuple[str, tuple]]):
+        with self.db_lock, self.db:
+            for statement, parameters in writes:
+                self.db.execute(statement, parameters)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+        }
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _store(self, key: str, entry: tuple):
+        if key in self.entries:
+            self.size_bytes -= len(self.entries.pop(key)[1])
+        self.entries[key] = entry
+        self.size_bytes += len(entry[1])
+        while self.size_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, value) = self.entries.popitem(last=False)
+            self.size_bytes -= len(value)
+
+    def _evict(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[1])
+        if self.db is not None:
+            self._queue_write("DELETE FROM llm_cache WHERE key = ?", (key,))
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from llm_cache import LLMCache
+from metrics import metrics
+from rate_limiter import RateLimiter, TokenBudget
+
+
+class LLMClient:
+    """
+    Shared entry point for chat completions used by the searcher and researcher.
+
+    Requests are served from the response cache when possible; otherwise they
+    wait for the shared rate limiter in their priority lane, and 429 / 5xx /
+    connection errors are retried with exponential backoff, honouring the
+    provider's retry-after. AsyncOpenAI reads OPENAI_BASE_URL, so pointing it at
+    a local mock server (see mock_llm.py) exercises the whole path offline;
+    set_backend() swaps in an in-process backend instead.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        cache: Optional[LLMCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        budget: Optional[TokenBudget] = None,
+        max_retries: int = 6,
+        max_backoff: float = 60.0,
+    ):
+        self._client = client
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.budget = budget or TokenBudget()
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.embed_batch_size = 512  # Texts per embeddings request; the API takes at most 2048
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Created on first use, so importing this module needs no API key.
+            # Retries are handled here so they go through the rate limiter
+            self._client = AsyncOpenAI(max_retries=0)
+        return self._client
+
+    def set_backend(self, client):
+        """
+        Sends requests to `client` from now on: anything with an AsyncOpenAI-style
+        chat.completions.create(), such as mock_llm.MockAsyncOpenAI.
+        """
+        self._client = client
+
+    async def chat_completion(self, lane: str = "evaluate", site: Optional[str] = None,
+                              parse: Optional[Callable[[ChatCompletion], Any]] = None, **kwargs) -> Any:
+        """
+        `site` names the call site in metrics (defaults to the lane).
+
+        `parse` turns the response into what the caller needs, raising if it
+        cannot, and its result is returned in place of the response. A response
+        is only cached once it parses, and a cached response that does not is
+        evicted and requested again, so a malformed answer is never replayed.
+        Without `parse`, a request with tools must get tool calls with JSON
+        arguments back.
+        """
+        site = site or lane
+        if parse is None:
+            parse = _check_tool_calls if "tools" in kwargs else _response
+        key = None
+        if self.cache is not None:
+            key = LLMCache.make_key(kwargs)
+            cached = self.cache.get(key)
+            metrics.inc("llm_cache_lookups_total", site=site, result="hit" if cached is not None else "miss")
+            if cached is not None:
+                try:
+                    return parse(ChatCompletion.model_validate_json(cached))
+                except Exception as e:
+                    print(f"Evicting a cached {site} response that does not parse: {e!r}")
+                    self.cache.delete(key)
+
+        response = await self._create_with_retries(lane, site, kwargs)
+        result = parse(response)
+
+        if key is not None:
+            self.cache.set(key, response.model_dump_json())
+        return result
+
+    async def chat_completion_stream(self, lane: str = "evaluate", site: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Streams the text of a chat completion as it is generated.
+
+        A cached response is replayed as a single chunk; a streamed response is
+        cached once complete, under the same key as the non-streaming call.
+        Retries only happen before the first chunk arrives.
+        """
+        site = site or lane
+        key = None
+        if self.cache is not None:
+            key = LLMCache.make_key(kwargs)
+            cached = self.cache.get(key)
+            metrics.inc("llm_cache_lookups_total", site=site, result="hit" if cached is not None else "miss")
+            if cached is not None:
+                yield ChatCompletion.model_validate_json(cached).choices[0].message.content
+                return
+
+        stream_kwargs = dict(kwargs, stream=True, stream_options={"include_usage": True})
+        estimated_tokens = self.estimate_tokens(kwargs)
+        started = time.monotonic()
+        stream = await self._create_with_retries(lane, site, stream_kwargs)
+        parts = []
+        async for chunk in stream:
+            if chunk.usage is not None:
+                self._record_usage(site, kwargs, estimated_tokens, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not parts:
+                    metrics.observe("llm_first_token_seconds", time.monotonic() - started, site=site)
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        metrics.observe("llm_stream_seconds", time.monotonic() - started, site=site)
+
+        if key is not None:
+            completion = ChatCompletion.model_validate({
+                "id": "stream",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": kwargs.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(parts)}}],
+            })
+            self.cache.set(key, completion.model_dump_json())
+
+    async def embed(self, texts: List[str], model: str = "text-embedding-3-small", lane: str = "evaluate",
+                    site: str = "embed") -> List[List[float]]:
+        """
+        Embedding vectors for `texts`, in order. Each text is cached on its own,
+        so only texts not embedded before are sent, embed_batch_size per request.
+        """
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        keys = [LLMCache.make_key({"model": model, "input": text}) for text in texts]
+        if self.cache is not None:
+            for i, key in enumerate(keys):
+                cached = self.cache.get(key)
+                metrics.inc("llm_cache_lookups_total", site=site, result="hit" if cached is not None else "miss")
+                if cached is not None:
+                    vectors[i] = json.loads(cached)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        for start in range(0, len(missing), self.embed_batch_size):
+            batch = missing[start:start + self.embed_batch_size]
+            kwargs = {"model": model, "input": [texts[i] for i in batch]}
+            response = await self._create_with_retries(lane, site, kwargs, create=self.client.embeddings.create)
+            for i, item in zip(batch, sorted(response.data, key=lambda item: item.index)):
+                vectors[i] = item.embedding
+                if self.cache is not None:
+                    self.cache.set(keys[i], json.dumps(item.embedding))
+        return vectors
+
+    async def _create_with_retries(self, lane: str, site: str, kwargs: dict, create=None) -> Any:
+        # Chat completions unless another endpoint's create() is given
+        create = create or self.client.chat.completions.create
+        estimated_tokens = self.estimate_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            with metrics.timer("llm_rate_limit_wait_seconds", lane=lane):
+                await self.rate_limiter.acquire(estimated_tokens, lane)
+            try:
+                with metrics.timer("llm_request_seconds", site=site):
+                    response = await create(**kwargs)
+            except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+                metrics.inc("llm_errors_total", site=site, error=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                print(f"LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                if isinstance(e, openai.RateLimitError):
+                    # Back off every lane, not just this request
+                    self.rate_limiter.cooldown(delay)
+                await asyncio.sleep(delay)
+                continue
+
+            # Streams report usage on their final chunk instead
+            if getattr(response, "usage", None) is not None:
+                self._record_usage(site, kwargs, estimated_tokens, response.usage)
+            return response
+
+    def _record_usage(self, site: str, kwargs: dict, estimated_tokens: int, usage):
+        self.rate_limiter.record_usage(estimated_tokens, usage.total_tokens)
+        # Embedding responses have no completion tokens
+        completion_tokens = getattr(usage, "completion_tokens", 0)
+        self.budget.record(kwargs.get("model", ""), usage.prompt_tokens, completion_tokens)
+        metrics.inc("llm_requests_total", site=site)
+        metrics.inc("llm_tokens_total", usage.prompt_tokens, site=site, kind="prompt")
+        metrics.inc("llm_tokens_total", completion_tokens, site=site, kind="completion")
+        # Prompt tokens the provider served from its prompt cache (a subset of the prompt tokens)
+        details = getattr(usage, "prompt_tokens_details", None)
+        metrics.inc("llm_tokens_total", getattr(details, "cached_tokens", None) or 0, site=site, kind="cached")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after_ms = response.headers.get("retry-after-ms")
+            retry_after = response.headers.get("retry-after")
+            try:
+                if retry_after_ms is not None:
+                    return float(retry_after_ms) / 1000
+                if retry_after is not None:
+                    return float(retry_after)
+            except ValueError:
+                pass
+        return min(self.max_backoff, (2 ** attempt) * (1 + random.random()))
+
+    @staticmethod
+    def estimate_tokens(kwargs: dict) -> int:
+        # ~4 characters per token for the prompt plus an allowance for the completion, if there is one
+        prompt_chars = (len(json.dumps(kwargs.get("messages", []))) + len(json.dumps(kwargs.get("tools", [])))
+                        + len(json.dumps(kwargs.get("input", []))))
+        return prompt_chars // 4 + (0 if "input" in kwargs else kwargs.get("max_tokens", 500))
+
+
+def _env_number(name: str, cast):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+
+def _response(response: ChatCompletion) -> ChatCompletion:
+    return response
+
+
+def _check_tool_calls(response: ChatCompletion) -> ChatCompletion:
+    # Every caller that sends tools reads the arguments of the first tool call
+    tool_calls = response.choices[0].message.tool_calls
+    if not tool_calls:
+        raise ValueError("expected a tool call")
+    for tool_call in tool_calls:
+        json.loads(tool_call.function.arguments)
+    return response
+
+
+def _cache_stat(name: str):
+    return lambda: llm_client.cache.stats()[name] if llm_client.cache is not None else 0
+
+
+# Set LLM_CACHE_PATH to persist the response cache across runs
+llm_client = LLMClient(
+    cache=LLMCache(db_path=os.environ.get("LLM_CACHE_PATH")),
+    rate_limiter=RateLimiter(
+        requests_per_minute=_env_number("LLM_REQUESTS_PER_MINUTE", float) or 500,
+        tokens_per_minute=_env_number("LLM_TOKENS_PER_MINUTE", float) or 200_000,
+    ),
+    budget=TokenBudget(
+        max_tokens=_env_number("LLM_TOKEN_BUDGET", int),
+        max_cost=_env_number("LLM_COST_BUDGET", float),
+    ),
+)
+
+for _stat in ("hit_rate", "entries", "size_bytes"):
+    metrics.gauge(f"llm_cache_{_stat}", _cache_stat(_stat))
+metrics.gauge("llm_budget_tokens", lambda: llm_client.budget.total_tokens)
+metrics.gauge("llm_budget_cost_usd", lambda: llm_client.budget.cost)
@@ -0,0 +1,172 @@
+import asyncio
+import bisect
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# Upper bounds in seconds; LLM calls range from tens of milliseconds (cache, mock) to a minute (retries)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot counts values above every bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-th quantile (the largest bucket bound if it is above them all).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters, callback gauges and latency histograms, each identified by a
+    name and a set of labels, e.g. llm_request_seconds{site="expand"}.
+
+    Updates and reads (snapshot(), prometheus(), served by the control plane)
+    all happen on the event loop, so no locking is needed. Gauges are
+    callbacks evaluated at read time, so queue depths are never stale and cost
+    nothing between reads.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, _labels(labels)), 0)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def gauge(self, name: str, read: Callable[[], float], **labels):
+        """
+        Registers (or replaces) a gauge whose value is read(), evaluated on every read.
+        """
+        self.gauges[(name, _labels(labels))] = read
+
+    def timer(self, name: str, **labels) -> "_Timer":
+        """
+        Context manager that observes its elapsed time into a histogram.
+        """
+        return _Timer(self, name, labels)
+
+    def snapshot(self) -> dict:
+        gauges = {}
+        for (name, labels), read in list(self.gauges.items()):
+            try:
+                gauges[_series(name, labels)] = read()
+            except Exception as e:
+                gauges[_series(name, labels)] = None
+                print(f"Error reading gauge {name}: {e!r}")
+        return {
+            "timestamp": time.time(),
+            "uptime_s": time.time() - self.started_at,
+            "counters": {_series(name, labels): value for (name, labels), value in list(self.counters.items())},
+            "gauges": gauges,
+            "histograms": {_series(name, labels): histogram.snapshot() for (name, labels), histogram in list(self.histograms.items())},
+        }
+
+    def prometheus(self) -> str:
+        """
+        The registry in the Prometheus text exposition format.
+        """
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), read in sorted(self.gauges.items(), key=lambda item: item[0]):
+            try:
+                lines.append(f"{_series(name, labels)} {float(read())}")
+            except Exception:
+                continue
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{_series(name + '_bucket', labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {histogram.sum}")
+            lines.append(f"{_series(name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    async def run_snapshots(self, path: str, interval: float = 15.0):
+        """
+        Writes snapshot() as JSON to `path` every `interval` seconds, replacing the previous snapshot atomically.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self._write_snapshot, path, self.snapshot())
+
+    @staticmethod
+    def _write_snapshot(path: str, snapshot: dict):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class _Timer:
+    def __init__(self, registry: MetricsRegistry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.monotonic() - self.started, **self.labels)
+
+
+def _series(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# Shared by the searcher, the researcher and the LLM client
+metrics = MetricsRegistry()
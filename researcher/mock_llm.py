@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import types
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+import openai
+from aiohttp import web
+from openai.types import CreateEmbeddingResponse
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+_ADJECTIVES = ["voice-first", "AI-powered", "real-time", "community", "subscription", "on-demand", "privacy-preserving",
+               "multilingual", "low-cost", "peer-to-peer", "predictive", "automated", "mobile", "local", "hybrid"]
+_PRODUCTS = ["tutor", "marketplace", "assistant", "coach", "concierge", "translator", "scheduler", "triage service",
+             "analytics platform", "booking agent", "companion", "compliance checker", "sales agent", "help desk"]
+_AUDIENCES = ["small clinics", "farmers", "freelancers", "retirees", "truck drivers", "restaurants", "students",
+              "landlords", "nonprofits", "field technicians", "tourists", "parents", "artisans", "startups"]
+_REGIONS = ["in Lagos", "in rural India", "in Berlin", "across Latin America", "in San Francisco", "in Jakarta",
+            "for remote teams", "in small towns", "across Europe", "in Nairobi", "online", "in Manila"]
+_FILLER = ("The market is fragmented and incumbents are slow to adopt new channels. A small team could validate "
+           "demand with a pilot, then grow through partnerships. Key risks are regulation, customer acquisition "
+           "cost and reliance on third-party models. ").split()
+
+MOCK_PERSONAS = [f"A {audience[:-1] if audience.endswith('s') else audience} {region}"
+                 for audience in _AUDIENCES for region in _REGIONS]
+
+
+class MockLLM:
+    """
+    Stand-in for the chat completions API that answers every prompt the
+    searcher and researcher send with a well-formed response.
+
+    Tool calls get valid arguments for the tool that was offered, free-text
+    comparisons get a "1"/"2" verdict, listwise ranking prompts get a shuffled
+    order of the idea numbers and research prompts get a report that starts
+    with a compound score. Latency is log-normally distributed around
+    `latency` seconds, and a share of requests fail with 429 (with a
+    retry-after-ms header) or 500. Usage is estimated at ~4 characters per
+    token, and prompt caching is mimicked the way OpenAI does it: the longest
+    previously seen prefix of the request (tools, then messages), from
+    cache_min_tokens in 128-token steps, is reported as cached. Embeddings
+    hash each word of a text into one of embedding_dimensions slots, so texts
+    that share words come out close. Counters in `calls`, `batch_sizes` and the token totals let a
+    benchmark see what the code under test asked for.
+    """
+
+    def __init__(self, latency: float = 0.05, latency_sigma: float = 0.5, rate_limit_rate: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 0.2, research_words: int = 300, cache_min_tokens: int = 1024,
+                 embedding_dimensions: int = 256, seed: Optional[int] = None):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.research_words = research_words
+        self.cache_min_tokens = cache_min_tokens
+        self.embedding_dimensions = embedding_dimensions
+        self.prefixes = set()  # Hashes of the request prefixes seen so far, at 128-token boundaries
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.failures = Counter()
+        self.batch_sizes = Counter()  # Ideas per batched evaluation request
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    async def delay(self, scale: float = 1.0):
+        if self.latency > 0:
+            await asyncio.sleep(scale * self.latency * self.random.lognormvariate(0, self.latency_sigma))
+
+    def failure(self) -> Optional[int]:
+        """
+        The HTTP status this request should fail with, if any.
+        """
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.failures[429] += 1
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.failures[500] += 1
+            return 500
+        return None
+
+    def respond(self, request: dict) -> dict:
+        """
+        A chat.completion dict answering `request` (the create() keyword arguments).
+        """
+        messages = request.get("messages", [])
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        tools = request.get("tools") or []
+        message = {"role": "assistant", "content": None}
+
+        if tools:
+            name = tools[0]["function"]["name"]
+            arguments = self.tool_arguments(name, prompt)
+            message["tool_calls"] = [{
+                "id": f"call_{self.random.getrandbits(32):08x}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }]
+            kind, output = name, message["tool_calls"][0]["function"]["arguments"]
+        else:
+            kind, output = self.text_response(prompt)
+            message["content"] = output
+
+        self.calls[kind] += 1
+        serialized = json.dumps(tools) + json.dumps(messages)
+        prompt_tokens = len(serialized) // 4
+        cached_tokens = self.cached_prefix_tokens(serialized)
+        completion_tokens = len(output) // 4 + 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+        return {
+            "id": f"chatcmpl-mock-{self.random.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "tool_calls" if tools else "stop", "message": message}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+        }
+
+    def embed(self, request: dict) -> dict:
+        """
+        A create embedding response dict for `request` (the create() keyword arguments).
+        """
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = []
+        for index, text in enumerate(inputs):
+            vector = [0.0] * self.embedding_dimensions
+            for word in re.findall(r"[a-z0-9]+", text.lower()):
+                vector[zlib.crc32(word.encode("utf-8")) % self.embedding_dimensions] += 1.0
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        self.calls["embed"] += 1
+        prompt_tokens = sum(len(text) for text in inputs) // 4 + 1
+        self.prompt_tokens += prompt_tokens
+        return {"object": "list", "model": request.get("model", "mock"), "data": data,
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}}
+
+    def cached_prefix_tokens(self, serialized: str) -> int:
+        cached, hit = 0, True
+        for end in range(self.cache_min_tokens * 4, len(serialized) + 1, 128 * 4):
+            key = hash(serialized[:end])
+            if hit and key in self.prefixes:
+                cached = end // 4
+            else:
+                hit = False
+                self.prefixes.add(key)
+        return cached
+
+    def stream_chunks(self, request: dict, chunk_chars: int = 80) -> List[dict]:
+        """
+        The response to `request` as chat.completion.chunk dicts, ending with a usage-only chunk.
+        """
+        completion = self.respond(request)
+        content = completion["choices"][0]["message"]["content"] or ""
+        base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                "model": completion["model"]}
+        chunks = [dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": content[i:i + chunk_chars]},
+                                       "finish_reason": None}])
+                  for i in range(0, len(content), chunk_chars)]
+        chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        chunks.append(dict(base, choices=[], usage=completion["usage"]))
+        return chunks
+
+    def tool_arguments(self, name: str, prompt: str) -> dict:
+        score = lambda: self.random.randint(1, 5)
+        if name == "propose_business_ideas":
+            return {"ideas": [{"idea_description": self.idea_description()} for _ in range(3)]}
+        if name == "propose_goal_requirements":
+            return {"requirements": [{"idea_requirement": f"Secure {self.random.choice(_PRODUCTS)} partners among {self.random.choice(_AUDIENCES)}"}
+                                     for _ in range(3)]}
+        if name == "evaluate_idea":
+            return {"score": score(), "explanation": "Mock evaluation."}
+        if name == "evaluate_idea_combined":
+            return {"search_score": score(), "viability_score": score(),
+                    "additional_scores": [{"criterion": c, "score": score()} for c in self.additional_criteria(prompt)],
+                    "explanation": "Mock evaluation."}
+        if name == "evaluate_ideas_batch":
+            count = len(re.findall(r"^Idea \d+ Requirements:", prompt, re.MULTILINE))
+            self.batch_sizes[count] += 1
+            return {"evaluations": [
+                {"idea_index": index, "search_score": score(), "viability_score": score(),
+                 "additional_scores": [{"criterion": c, "score": score()} for c in self.additional_criteria(prompt)]}
+                for index in range(1, count + 1)
+            ]}
+        if name == "summarize_research":
+            return {"compound_score": self.random.randint(3, 9),
+                    "funding_level": self.random.choice(["bootstrapped", "$500k pre-seed", "$2M seed round"]),
+                    "team_needs": f"A {self.random.choice(_PRODUCTS)} specialist and a sales lead",
+                    "key_risks": [" ".join(self.random.choice(_FILLER) for _ in range(4)) for _ in range(3)],
+                    "verdict": "Mock verdict."}
+        raise ValueError(f"MockLLM has no response for tool {name!r}")
+
+    def text_response(self, prompt: str):
+        # Comparison prompts quote research, which itself starts with a compound score
+        if 'Respond with either "1" or "2"' in prompt:
+            return "compare", self.random.choice(["1", "2"])
+        if "from best to worst" in prompt:
+            numbers = [int(n) for n in re.findall(r"^\s*Idea (\d+):", prompt, re.MULTILINE)]
+            self.random.shuffle(numbers)
+            return "rank_window", ", ".join(map(str, numbers))
+        if "Compound score" in prompt:
+            words = [self.random.choice(_FILLER) for _ in range(self.research_words)]
+            return "research", f"Compound score: {self.random.randint(3, 9)}/10\n\n" + " ".join(words)
+        return "compare", self.random.choice(["1", "2"])
+
+    def idea_description(self) -> str:
+        r = self.random
+        return (f"A {r.choice(_ADJECTIVES)} {r.choice(_PRODUCTS)} for {r.choice(_AUDIENCES)} {r.choice(_REGIONS)}, "
+                f"{r.choice(_ADJECTIVES)} and {r.choice(_ADJECTIVES)}, codename {r.getrandbits(24):06x}")
+
+    @staticmethod
+    def additional_criteria(prompt: str) -> List[str]:
+        match = re.search(r"Additional Criteria: (\[.*?\])", prompt)
+        try:
+            criteria = json.loads(match.group(1)) if match else []
+        except ValueError:
+            return []
+        return [c if isinstance(c, str) else json.dumps(c) for c in criteria]
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "total_calls": sum(self.calls.values()),
+            "failures": dict(self.failures),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+class MockAsyncOpenAI:
+    """
+    In-process drop-in for AsyncOpenAI backed by a MockLLM, for
+    llm_client.set_backend(). Failures raise the same openai exceptions the
+    real client would, so retries and rate limiting are exercised too.
+    """
+
+    def __init__(self, mock: MockLLM):
+        self.mock = mock
+        self.chat = self
+        self.completions = self
+        self.embeddings = types.SimpleNamespace(create=self.create_embedding)
+
+    async def create(self, **kwargs):
+        await self.mock.delay()
+        status = self.mock.failure()
+        if status is not None:
+            raise self._error(status)
+        if kwargs.get("stream"):
+            return self._stream(kwargs)
+        return ChatCompletion.model_validate(self.mock.respond(kwargs))
+
+    async def create_embedding(self, **kwargs):
+        await self.mock.delay()
+        status = self.mock.failure()
+        if status is not None:
+            raise self._error(status)
+        return CreateEmbeddingResponse.model_validate(self.mock.embed(kwargs))
+
+    async def _stream(self, kwargs):
+        chunks = self.mock.stream_chunks(kwargs)
+        for chunk in chunks:
+            await self.mock.delay(1 / len(chunks))
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def _error(self, status: int) -> openai.APIStatusError:
+        headers = {"retry-after-ms": str(int(self.mock.retry_after * 1000))} if status == 429 else {}
+        response = _MockHTTPResponse(status, headers)
+        error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+        return error_class(f"Mock error {status}", response=response, body=None)
+
+
+class _MockHTTPResponse:
+    # Just what openai's APIStatusError and LLMClient's retry logic read from a response
+    def __init__(self, status_code: int, headers: dict):
+        self.status_code = status_code
+        self.headers = headers
+        self.request = None
+
+
+def make_mock_app(mock: MockLLM) -> web.Application:
+    """
+    An HTTP server for the mock: the chat completions API under /v1 (plain and
+    SSE streaming) and the embeddings API, plus no-op versions of the admin relay endpoints the
+    searcher and researcher post to.
+    """
+    app = web.Application()
+    processed_seq = {"ack": -1}
+
+    async def chat_completions(request):
+        body = await request.json()
+        await mock.delay()
+        status = mock.failure()
+        if status is not None:
+            headers = {"retry-after-ms": str(int(mock.retry_after * 1000))} if status == 429 else {}
+            return web.json_response({"error": {"message": f"Mock error {status}", "type": "mock"}},
+                                     status=status, headers=headers)
+        if not body.get("stream"):
+            return web.json_response(mock.respond(body))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = mock.stream_chunks(body)
+        for chunk in chunks:
+            await mock.delay(1 / len(chunks))
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def embeddings(request):
+        body = await request.json()
+        await mock.delay()
+        status = mock.failure()
+        if status is not None:
+            headers = {"retry-after-ms": str(int(mock.retry_after * 1000))} if status == 429 else {}
+            return web.json_response({"error": {"message": f"Mock error {status}", "type": "mock"}},
+                                     status=status, headers=headers)
+        return web.json_response(mock.embed(body))
+
+    async def processed_ideas_append(request):
+        # Mirrors the relay: 409 with its position if updates were missed, else append and acknowledge
+        body = await request.json()
+        if body.get("since_seq", -1) > processed_seq["ack"]:
+            return web.json_response({"ack_seq": processed_seq["ack"]}, status=409)
+        for idea in body.get("processed_ideas", []):
+            processed_seq["ack"] = max(processed_seq["ack"], idea["seq"])
+        return web.json_response({"ack_seq": processed_seq["ack"]})
+
+    async def accept(request):
+        await request.read()
+        return web.json_response({"message": "ok"})
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_post("/processed_ideas/append", processed_ideas_append)
+    for path in ("/idea", "/processed_ideas", "/research_progress"):
+        app.router.add_post(path, accept)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a mock chat completions API (point OPENAI_BASE_URL at http://host:port/v1)")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median response latency in seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="Shortest prefix reported as cached")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    web.run_app(make_mock_app(MockLLM(latency=args.latency, rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                                      cache_min_tokens=args.cache_min_tokens, seed=args.seed)), port=args.port)
@@ -0,0 +1,82 @@
+import os
+import random
+from collections import deque
+from typing import List, Optional
+
+
+class PersonaSampler:
+    """
+    Draws random personas from PersonaHub without shuffling or copying the dataset.
+
+    The dataset is loaded on first use, either from a local snapshot saved with
+    `Dataset.save_to_disk` (local_path, or the PERSONA_HUB_PATH environment
+    variable) or from the Hugging Face hub. Rows are read straight from the
+    memory-mapped Arrow column, so drawing k personas costs O(k). Personas drawn
+    in the last recent_window samples are skipped.
+    """
+
+    def __init__(
+        self,
+        dataset_name: str = "proj-persona/PersonaHub",
+        config_name: str = "persona",
+        local_path: Optional[str] = None,
+        recent_window: int = 300,
+    ):
+        self.dataset_name = dataset_name
+        self.config_name = config_name
+        self.local_path = local_path or os.environ.get("PERSONA_HUB_PATH")
+        self.column = None
+        self.size = 0
+        self.recent = deque(maxlen=recent_window)
+        self.recent_set = set()
+
+    @classmethod
+    def from_personas(cls, personas: List[str], recent_window: int = 300) -> "PersonaSampler":
+        """
+        A sampler over a fixed list of personas, e.g. for offline runs.
+        """
+        sampler = cls(recent_window=recent_window)
+        sampler.column = list(personas)
+        sampler.size = len(sampler.column)
+        return sampler
+
+    def load(self):
+        if self.column is not None:
+            return
+        if self.local_path and os.path.exists(self.local_path):
+            from datasets import load_from_disk
+            dataset = load_from_disk(self.local_path)
+        else:
+            from datasets import load_dataset
+            dataset = load_dataset(self.dataset_name, self.config_name, split="train")
+        self.column = dataset.data.column("persona")
+        self.size = len(self.column)
+
+    def sample(self, k: int) -> List[str]:
+        self.load()
+        k = min(k, self.size)
+        if len(self.recent_set) + k > self.size:
+            self._forget_recent()
+
+        indices = []
+        while len(indices) < k:
+            index = random.randrange(self.size)
+            if index in self.recent_set or index in indices:
+                continue
+            indices.append(index)
+
+        for index in indices:
+            if len(self.recent) == self.recent.maxlen:
+                self.recent_set.discard(self.recent[0])
+            self.recent.append(index)
+            self.recent_set.add(index)
+        return [self._persona(index) for index in indices]
+
+    def _persona(self, index: int) -> str:
+        value = self.column[index]
+        # Arrow scalars from the dataset, plain strings from from_personas
+        return value.as_py() if hasattr(value, "as_py") else value
+
+    def _forget_recent(self):
+        self.recent.clear()
+        self.recent_set.clear()
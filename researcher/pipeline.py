@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from metrics import metrics
+
+
+class Stage:
+    def __init__(self, name: str, handler: Callable[[object], Awaitable[None]], workers: int = 1,
+                 maxsize: int = 0, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue if queue is not None else asyncio.Queue(maxsize)
+        self.in_flight = 0
+        self.outstanding: Dict[int, object] = {}  # Items queued or being handled, by id()
+
+    def pending(self) -> int:
+        return self.queue.qsize() + self.in_flight
+
+    def outstanding_items(self) -> List[object]:
+        return list(self.outstanding.values())
+
+
+class Pipeline:
+    """
+    Named stages connected by bounded asyncio queues.
+
+    Each stage runs its own pool of workers that take items from the stage's
+    queue and hand them to its handler; a handler forwards work by putting it
+    on the next stage with `put`, which blocks while that stage is full. Idle
+    workers sleep on their queue and wake as soon as an item arrives.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Stage] = {}
+
+    def add_stage(self, name: str, handler: Callable[[object], Awaitable[None]], workers: int = 1,
+                  maxsize: int = 0, queue: Optional[asyncio.Queue] = None) -> Stage:
+        stage = Stage(name, handler, workers, maxsize, queue)
+        self.stages[name] = stage
+        metrics.gauge("stage_queue_depth", stage.queue.qsize, stage=name)
+        metrics.gauge("stage_in_flight", lambda: stage.in_flight, stage=name)
+        return stage
+
+    async def put(self, name: str, item):
+        stage = self.stages[name]
+        # Tracked before the put, so an item whose producer is cancelled mid-put is not lost
+        stage.outstanding[id(item)] = item
+        await stage.queue.put(item)
+
+    def pending(self, *names: str) -> int:
+        """
+        Items queued or being handled in the given stages (all stages if none given).
+        """
+        return sum(stage.pending() for name, stage in self.stages.items() if not names or name in names)
+
+    def depths(self) -> Dict[str, int]:
+        return {name: stage.queue.qsize() for name, stage in self.stages.items()}
+
+    async def run(self):
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(self._worker(stage))
+            for stage in self.stages.values()
+            for _ in range(stage.workers)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _worker(self, stage: Stage):
+        while True:
+            item = await stage.queue.get()
+            stage.in_flight += 1
+            started = time.monotonic()
+            try:
+                await stage.handler(item)
+            except Exception as e:
+                metrics.inc("stage_errors_total", stage=stage.name)
+                print(f"Error in pipeline stage '{stage.name}': {e!r}")
+            finally:
+                stage.in_flight -= 1
+                metrics.observe("stage_seconds", time.monotonic() - started, stage=stage.name)
+                stage.queue.task_done()
+            # Skipped on cancellation, so interrupted work stays visible to checkpoints
+            stage.outstanding.pop(id(item), None)
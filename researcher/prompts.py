@@ -0,0 +1,170 @@
+from typing import Dict, List
+
+from metrics import metrics
+
+
+class PromptTemplate:
+    """
+    A chat prompt laid out for provider prompt caching.
+
+    OpenAI caches the longest prefix of a request it has recently seen once it
+    reaches 1024 tokens. The prefix starts with any tool schema the caller
+    sends, which is fixed per call site, and continues with the messages
+    messages() returns, ordered from most to least stable: the fixed
+    instructions as the system message, then one user message holding the
+    criteria, which only change when the admin updates them, followed by the
+    per-call variables. Every call of a template under the same criteria then
+    shares one cached prefix.
+
+    `criteria` and `variables` are str.format templates; the template's name
+    doubles as the call-site label in metrics.
+    """
+
+    def __init__(self, name: str, instructions: str, variables: str, criteria: str = ""):
+        self.name = name
+        self.instructions = instructions
+        self.variables = variables
+        self.criteria = criteria
+
+    def messages(self, **values) -> List[dict]:
+        variables = self.variables.format(**values)
+        content = f"{self.criteria.format(**values)}\n\n{variables}" if self.criteria else variables
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": content},
+        ]
+
+    def cached_token_ratio(self) -> float:
+        """
+        Share of this template's prompt tokens the provider served from its cache.
+        """
+        prompt_tokens = metrics.counter("llm_tokens_total", site=self.name, kind="prompt")
+        cached_tokens = metrics.counter("llm_tokens_total", site=self.name, kind="cached")
+        return cached_tokens / prompt_tokens if prompt_tokens else 0.0
+
+
+_SCORE_SCALE = "Use a scale from 1 to 5, where 1 is the lowest and 5 is the highest."
+_COMBINED_HEURISTIC = ("You are an expert business idea and viability evaluator. Score the given idea on how well it matches "
+                       "the search criteria, on its potential for success, scalability, and profitability, and on each "
+                       "additional criterion. " + _SCORE_SCALE)
+_EVALUATION_CRITERIA = "Search Criteria: {search_criteria}\n\nViability Criteria: {free_text}\n\nAdditional Criteria: {additional_criteria}"
+_RESEARCHED_CONSIDERATIONS = """Also, consider:
+1. How realistic is it to satisfy the requirements?
+2. What level of funding will be required and what kind of team members for it?"""
+
+PROMPT_TEMPLATES: Dict[str, PromptTemplate] = {template.name: template for template in [
+    PromptTemplate(
+        "expand",
+        "You are a helpful assistant. Please provide 3 similar business ideas based on what the user says.",
+        criteria="The search criteria we are interested in is: {search_criteria}",
+        variables="Here's my idea: {idea}\n\n Can you give a similar business idea?",
+    ),
+    PromptTemplate(
+        "requirements",
+        "For this business goal, create a list of 3 high level things we need to make it happen. Be more descriptive "
+        "and build upon any existing requirements.",
+        variables="Here's the goal: {goal}\nExisting requirements: {requirements}",
+    ),
+    PromptTemplate(
+        "seed",
+        "You are a helpful assistant. Please generate business ideas for the given persona provided the search criteria.",
+        criteria="The search criteria we are interested in is: {search_criteria}",
+        variables="Here's the prospective persona: {persona}\n\n Can you give {count} business ideas for them?",
+    ),
+    PromptTemplate(
+        "search_heuristic",
+        "You are an expert business idea evaluator. Evaluate the given idea based on the provided criteria. " + _SCORE_SCALE,
+        criteria="Search Criteria: {search_criteria}",
+        variables="Idea: {idea}",
+    ),
+    PromptTemplate(
+        "viability_heuristic",
+        "You are an expert business viability evaluator. Evaluate the given idea based on its potential for success, "
+        "scalability, and profitability. " + _SCORE_SCALE,
+        criteria="Additional Criteria: {free_text}",
+        variables="Idea: {idea}\n\nIdea Requirements: {requirements}",
+    ),
+    PromptTemplate(
+        "combined_heuristic",
+        _COMBINED_HEURISTIC,
+        criteria=_EVALUATION_CRITERIA,
+        variables="Idea: {idea}\n\nIdea Requirements: {requirements}",
+    ),
+    PromptTemplate(
+        "batch_heuristic",
+        _COMBINED_HEURISTIC + " Evaluate every numbered idea independently.",
+        criteria=_EVALUATION_CRITERIA,
+        variables="{numbered_ideas}",
+    ),
+    PromptTemplate(
+        "research",
+        """You are an expert business analyst and researcher. For the following business idea and its requirements, evaluate:
+1. What online research is needed to validate the work involved?
+2. How realistic is it to satisfy the requirements?
+3. What level of funding will be required and what kind of team members for it?
+
+Start your response with a line of the form "Compound score: X/10", giving a
+compound score out of 10 that weighs everything together.
+
+Then provide a detailed response for the questions above.""",
+        variables="Business Idea: {idea}\nRequirements: {requirements}",
+    ),
+    PromptTemplate(
+        "digest",
+        "You are an expert business analyst. Summarize research reports faithfully and concisely.",
+        variables="Business Idea: {idea}\n\nResearch report:\n{research}",
+    ),
+    PromptTemplate(
+        "compare",
+        'You are an expert business idea evaluator. Compare two business ideas based on the criteria given. '
+        'Which idea is better? Respond with either "1" or "2".',
+        criteria="Criteria: {free_text}",
+        variables="Idea 1: {first}\nIdea 2: {second}",
+    ),
+    PromptTemplate(
+        "researched_compare",
+        'You are an expert business idea evaluator. Compare two researched business ideas based on the criteria given.\n\n'
+        + _RESEARCHED_CONSIDERATIONS + '\n\nWhich idea is better? Respond with either "1" or "2".',
+        criteria="Criteria: {free_text}",
+        variables="Idea 1: {first}\nResearch summary 1: {first_research}\n\nIdea 2: {second}\nResearch summary 2: {second_research}",
+    ),
+    PromptTemplate(
+        "rank_window",
+        'You are an expert business idea evaluator. Rank the given business ideas based on the criteria given. '
+        'List the idea numbers from best to worst, separated by commas, e.g. "2, 3, 1".',
+        criteria="Criteria: {free_text}",
+        variables="{listing}",
+    ),
+    PromptTemplate(
+        "researched_rank_window",
+        'You are an expert business idea evaluator. Rank the given researched business ideas based on the criteria given.\n\n'
+        + _RESEARCHED_CONSIDERATIONS + '\n\nList the idea numbers from best to worst, separated by commas, e.g. "2, 3, 1".',
+        criteria="Criteria: {free_text}",
+        variables="{listing}",
+    ),
+]}
+
+for _template in PROMPT_TEMPLATES.values():
+    metrics.gauge("llm_cached_token_ratio", _template.cached_token_ratio, site=_template.name)
+
+
+def prompt_messages(name: str, **values) -> List[dict]:
+    if name not in PROMPT_TEMPLATES:
+        raise ValueError(f"Unknown prompt template: {name}")
+    return PROMPT_TEMPLATES[name].messages(**values)
+
+
+def cached_token_report() -> Dict[str, dict]:
+    """
+    Prompt and cached token totals and the cached-token ratio per template that has been used.
+    """
+    report = {}
+    for name, template in PROMPT_TEMPLATES.items():
+        prompt_tokens = metrics.counter("llm_tokens_total", site=name, kind="prompt")
+        if prompt_tokens:
+            report[name] = {
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": metrics.counter("llm_tokens_total", site=name, kind="cached"),
+                "cached_ratio": template.cached_token_ratio(),
+            }
+    return report
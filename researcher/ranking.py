@@ -0,0 +1,203 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+# compare(a, b) returns the score of a against b: 1 if a wins, 0 if b wins, 0.5 for a tie
+CompareFn = Callable[[str, str], Awaitable[float]]
+# rank_window(keys) returns the same keys ordered best first
+RankWindowFn = Callable[[List[str]], Awaitable[List[str]]]
+
+
+class RankingEngine(ABC):
+    """
+    Keeps a best-first ranking of idea keys and inserts new keys with as few
+    LLM comparisons as the strategy allows.
+
+    Every comparison outcome is recorded and folded into the ELO ratings held
+    in `ratings`, so callers can keep reporting ELO alongside the ranking.
+    comparison_count counts pairwise outcomes and call_count the LLM calls
+    that produced them; they differ for strategies that judge several keys
+    per call.
+    """
+
+    def __init__(self, compare: CompareFn, ratings: Dict[str, float], k_factor: float = 32, initial_rating: float = 1500):
+        self.compare = compare
+        self.ratings = ratings
+        self.k_factor = k_factor
+        self.initial_rating = initial_rating
+        self.ranking: List[str] = []
+        self.outcomes: Dict[Tuple[str, str], float] = {}
+        self.comparison_count = 0
+        self.call_count = 0
+        self.lock = asyncio.Lock()
+
+    async def insert(self, key: str):
+        async with self.lock:
+            if key in self.ranking:
+                return
+            self.ratings.setdefault(key, self.initial_rating)
+            await self._insert(key)
+
+    @abstractmethod
+    async def _insert(self, key: str):
+        """
+        Places a key that is not ranked yet into self.ranking.
+        """
+
+    def remove(self, key: str):
+        if key in self.ranking:
+            self.ranking.remove(key)
+            # Outcomes judged on what the key used to stand for no longer back its position
+            for pair in [pair for pair in self.outcomes if key in pair]:
+                del self.outcomes[pair]
+
+    def reset(self):
+        """
+        Forgets all comparison outcomes, e.g. after the acceptance criteria change.
+        """
+        self.ranking = []
+        self.outcomes.clear()
+
+    async def _compare(self, a: str, b: str) -> float:
+        score = await self.compare(a, b)
+        self.call_count += 1
+        self.record(a, b, score)
+        return score
+
+    def record(self, a: str, b: str, score: float, k_factor: float = None):
+        self.comparison_count += 1
+        self.outcomes[(a, b)] = score
+        self.outcomes[(b, a)] = 1 - score
+        self.update_elo(a, b, score, k_factor)
+
+    def update_elo(self, a: str, b: str, score: float, k_factor: float = None):
+        k_factor = self.k_factor if k_factor is None else k_factor
+        expected_a = 1 / (1 + 10 ** ((self.ratings[b] - self.ratings[a]) / 400))
+        self.ratings[a] += k_factor * (score - expected_a)
+        self.ratings[b] += k_factor * ((1 - score) - (1 - expected_a))
+
+    def confidence(self) -> float:
+        """
+        Share of adjacent pairs in the ranking whose order is backed by a direct
+        comparison that agrees with it. 1.0 means every neighbouring pair was
+        compared head to head; lower values mean the order leans on transitivity
+        or on rating estimates.
+        """
+        if len(self.ranking) < 2:
+            return 1.0
+        supported = 0
+        for better, worse in zip(self.ranking, self.ranking[1:]):
+            if self.outcomes.get((better, worse), 0) >= 0.5:
+                supported += 1
+        return supported / (len(self.ranking) - 1)
+
+
+class AllPairsRanker(RankingEngine):
+    """
+    Compares a new key against every ranked key: O(n) comparisons per insert.
+    The ranking is ordered by ELO rating.
+    """
+
+    async def _insert(self, key: str):
+        for other in list(self.ranking):
+            await self._compare(key, other)
+        self.ranking.append(key)
+        self.ranking.sort(key=lambda k: self.ratings[k], reverse=True)
+
+
+class BinaryInsertionRanker(RankingEngine):
+    """
+    Binary-searches the new key's position in the current ranking:
+    O(log n) comparisons per insert.
+    """
+
+    async def _insert(self, key: str):
+        lo, hi = 0, len(self.ranking)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if await self._compare(key, self.ranking[mid]) > 0.5:
+                hi = mid
+            else:
+                lo = mid + 1
+        self.ranking.insert(lo, key)
+
+
+class EloSampledRanker(RankingEngine):
+    """
+    Plays the new key against the k most informative opponents, i.e. those whose
+    current rating is closest to its own, re-estimating after each game:
+    O(k) comparisons per insert. The ranking is ordered by ELO rating.
+    """
+
+    def __init__(self, *args, comparisons_per_insert: int = 4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.comparisons_per_insert = comparisons_per_insert
+
+    async def _insert(self, key: str):
+        candidates = list(self.ranking)
+        for _ in range(min(self.comparisons_per_insert, len(candidates))):
+            opponent = min(candidates, key=lambda k: abs(self.ratings[k] - self.ratings[key]))
+            candidates.remove(opponent)
+            await self._compare(key, opponent)
+        self.ranking.append(key)
+        self.ranking.sort(key=lambda k: self.ratings[k], reverse=True)
+
+
+class ListwiseRanker(RankingEngine):
+    """
+    Has the judge order up to window_size keys per call instead of two.
+
+    A new key is placed by a window_size-ary search: each call ranks it among
+    window_size - 1 evenly spaced pivots from its current interval of the
+    ranking, which narrows it to the gap between two neighbouring pivots, so
+    an insert takes O(log_k n) calls. Every ordering is folded in as the
+    k(k-1)/2 pairwise outcomes it implies, with the K-factor divided by k - 1
+    so a key's rating moves about as much per call as in one head-to-head game.
+    """
+
+    def __init__(self, *args, rank_window: RankWindowFn = None, window_size: int = 5, **kwargs):
+        super().__init__(*args, **kwargs)
+        if rank_window is None:
+            raise ValueError("The listwise strategy needs a rank_window function")
+        if window_size < 2:
+            raise ValueError("window_size must be at least 2")
+        self.rank_window = rank_window
+        self.window_size = window_size
+
+    async def _insert(self, key: str):
+        lo, hi = 0, len(self.ranking)
+        while lo < hi:
+            span = hi - lo
+            count = min(self.window_size - 1, span)
+            # Pivots split [lo, hi) into count + 1 gaps; if count == span every key in it is a pivot
+            positions = [lo + (i + 1) * span // (count + 1) for i in range(count)]
+            order = await self._rank([key] + [self.ranking[position] for position in positions])
+            above = order.index(key)
+            lo, hi = (positions[above - 1] + 1 if above else lo), (positions[above] if above < count else hi)
+        self.ranking.insert(lo, key)
+
+    async def _rank(self, keys: List[str]) -> List[str]:
+        ranked = await self.rank_window(keys)
+        self.call_count += 1
+        # Ignore keys the judge invented or repeated, and put any it left out last
+        order = [key for key in dict.fromkeys(ranked) if key in keys]
+        order += [key for key in keys if key not in order]
+        k_factor = self.k_factor / (len(order) - 1)
+        for i, better in enumerate(order):
+            for worse in order[i + 1:]:
+                self.record(better, worse, 1.0, k_factor)
+        return order
+
+
+RANKING_ENGINES = {
+    "all_pairs": AllPairsRanker,
+    "binary_insertion": BinaryInsertionRanker,
+    "elo_sampled": EloSampledRanker,
+    "listwise": ListwiseRanker,
+}
+
+
+def make_ranking_engine(strategy: str, compare: CompareFn, ratings: Dict[str, float], **kwargs) -> RankingEngine:
+    if strategy not in RANKING_ENGINES:
+        raise ValueError(f"Unknown ranking strategy: {strategy}")
+    return RANKING_ENGINES[strategy](compare, ratings, **kwargs)
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Optional
+
+# Lower value = served first. Evaluation keeps the frontier moving, so it is never
+# starved by the long tail of ranking comparisons.
+LANE_PRIORITIES = {
+    "evaluate": 0,
+    "expand": 1,
+    "research": 1,
+    "rank": 2,
+}
+
+# USD per 1M tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        self.refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self.refill()
+        self.level -= amount
+
+    def adjust(self, amount: float):
+        """
+        Corrects an earlier estimate once the real usage is known; may go negative.
+        """
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every LLM call.
+
+    Callers wait in priority lanes (see LANE_PRIORITIES): whenever capacity frees
+    up, the waiting request from the most important lane goes first, FIFO within
+    a lane. A provider-requested cooldown (e.g. a 429 retry-after) holds back all
+    lanes until it expires.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200_000):
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.waiters = []  # heap of (lane priority, seq, tokens, future)
+        self.sequence = itertools.count()
+        self.cooldown_until = 0.0
+        self.wakeup: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, tokens: int, lane: str = "evaluate"):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (LANE_PRIORITIES.get(lane, 1), next(self.sequence), tokens, future))
+        self._dispatch()
+        await future
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def cooldown(self, seconds: float):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    def _dispatch(self):
+        if self.wakeup is not None:
+            self.wakeup.cancel()
+            self.wakeup = None
+        while self.waiters:
+            _, _, tokens, future = self.waiters[0]
+            if future.cancelled():
+                heapq.heappop(self.waiters)
+                continue
+            tokens = min(tokens, self.token_bucket.capacity)
+            wait = max(
+                self.cooldown_until - time.monotonic(),
+                self.request_bucket.wait_time(1),
+                self.token_bucket.wait_time(tokens),
+            )
+            if wait > 0:
+                self.wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self.waiters)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            future.set_result(None)
+
+
+class TokenBudget:
+    """
+    Per-run spend limit in tokens and/or USD. Once exhausted, the searcher stops
+    generating new ideas; work already queued is still finished.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        self.cost += (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def exhausted(self) -> bool:
+        return ((self.max_tokens is not None and self.total_tokens >= self.max_tokens)
+                or (self.max_cost is not None and self.cost >= self.max_cost))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+            "exhausted": self.exhausted,
+        }
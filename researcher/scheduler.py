@@ -0,0 +1,177 @@
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+
+class SchedulerPolicy(ABC):
+    """
+    Decides what to do with an evaluated idea and at what priority the ideas
+    that come out of that action go back on the frontier.
+
+    Ideas at depth_limit always go to research; below it the policy picks
+    between expanding the idea and expanding its requirements. The searcher
+    reports every evaluation and every action to the policy, so adaptive
+    policies can learn from the results.
+    """
+
+    def __init__(self, depth_limit: int = 2, requirement_expansion_depth: int = 1):
+        self.depth_limit = depth_limit
+        self.requirement_expansion_depth = requirement_expansion_depth
+
+    def choose_action(self, idea, combined_score: float) -> str:
+        if idea.depth >= self.depth_limit:
+            return "research"
+        return self._choose_action(idea, combined_score)
+
+    @abstractmethod
+    def _choose_action(self, idea, combined_score: float) -> str:
+        """
+        "expand" or "requirements" for an idea below depth_limit.
+        """
+
+    @abstractmethod
+    def priority(self, idea, combined_score: float, action: str) -> float:
+        """
+        Frontier priority for the result of `action` on `idea`: the children of
+        an expansion, or the idea itself after a requirements expansion.
+        """
+
+    def record_evaluation(self, idea, combined_score: float):
+        pass
+
+    def record_action(self, idea, combined_score: float, action: str, results: List):
+        pass
+
+
+class FixedPenaltyPolicy(SchedulerPolicy):
+    """
+    The original schedule: expand below requirement_expansion_depth, expand
+    requirements from there on, and re-queue at the parent's score minus a
+    fixed penalty plus random jitter.
+    """
+
+    def __init__(self, depth_limit: int = 2, requirement_expansion_depth: int = 1,
+                 expansion_priority_penalty: float = 1.0, requirement_priority_penalty: float = 0.1,
+                 priority_jitter_range: float = 0.1):
+        super().__init__(depth_limit, requirement_expansion_depth)
+        self.expansion_priority_penalty = expansion_priority_penalty
+        self.requirement_priority_penalty = requirement_priority_penalty
+        self.priority_jitter_range = priority_jitter_range
+
+    def _choose_action(self, idea, combined_score: float) -> str:
+        return "requirements" if idea.depth >= self.requirement_expansion_depth else "expand"
+
+    def priority(self, idea, combined_score: float, action: str) -> float:
+        if action == "requirements":
+            jitter = random.uniform(-self.priority_jitter_range/2, self.priority_jitter_range/2)
+            return combined_score - self.requirement_priority_penalty + jitter
+        jitter = random.uniform(-self.priority_jitter_range, self.priority_jitter_range)
+        return combined_score - self.expansion_priority_penalty + jitter
+
+
+class LineageStats:
+    __slots__ = ("visits", "score_sum", "calls")
+
+    def __init__(self):
+        self.visits = 0  # Evaluations of this idea and its descendants
+        self.score_sum = 0.0
+        self.calls = 0  # LLM calls spent on this idea and its descendants
+
+
+class UCBPolicy(SchedulerPolicy):
+    """
+    Allocates expansions to the lineages and actions that have produced the
+    best scores per LLM call so far.
+
+    Every evaluation is backed up along the Idea.parent chain (as in MCTS), and
+    every call spent on an idea, whether evaluating, expanding or expanding its
+    requirements, is charged to all of its ancestors. An idea's results are
+    re-queued at its lineage's mean score, times how many evaluations per call
+    the lineage gets relative to the whole search (clamped to 1 +/- efficiency_clamp),
+    plus an exploration bonus of exploration / sqrt(visits), so at most
+    `exploration` points, that shrinks as the lineage is visited. The
+    result is clamped to the 1-5 score scale, so it stays comparable with the
+    raw combined scores seeds and re-scores are queued at. Until a lineage has
+    any results the idea's own score is used.
+
+    The choice between expand and requirements is a UCB1 bandit whose reward
+    is how much the resulting ideas improved on their parent's score, per call.
+    Statistics are not checkpointed and are relearned after a resume.
+    """
+
+    def __init__(self, depth_limit: int = 2, requirement_expansion_depth: int = 1, exploration: float = 0.5,
+                 efficiency_clamp: float = 0.2, min_score: float = 1.0, max_score: float = 5.0):
+        super().__init__(depth_limit, requirement_expansion_depth)
+        self.exploration = exploration
+        self.efficiency_clamp = efficiency_clamp
+        self.min_score = min_score
+        self.max_score = max_score
+        self.lineages: Dict[int, LineageStats] = {}
+        self.total_visits = 0
+        self.total_calls = 0
+        self.origins: Dict[int, tuple] = {}  # idea_id -> (action, parent score, calls per result)
+        self.action_pulls = {"expand": 0, "requirements": 0}
+        self.action_rewards = {"expand": 0.0, "requirements": 0.0}
+
+    def _choose_action(self, idea, combined_score: float) -> str:
+        for action in ("expand", "requirements"):
+            if self.action_pulls[action] == 0:
+                return action
+        total = self.action_pulls["expand"] + self.action_pulls["requirements"]
+
+        def ucb(action):
+            pulls = self.action_pulls[action]
+            return self.action_rewards[action] / pulls + self.exploration * math.sqrt(2 * math.log(total) / pulls)
+        return max(("expand", "requirements"), key=ucb)
+
+    def priority(self, idea, combined_score: float, action: str) -> float:
+        stats = self.lineages.get(idea.idea_id)
+        if stats is None or stats.visits == 0:
+            return combined_score
+        mean_score = stats.score_sum / stats.visits
+        # Evaluations per call in this lineage relative to the whole search, counting the call of the
+        # action being priced, which record_action only charges afterwards
+        efficiency = (stats.visits / (stats.calls + 1)) / (self.total_visits / max(1, self.total_calls))
+        efficiency = min(1 + self.efficiency_clamp, max(1 - self.efficiency_clamp, efficiency))
+        exploration = self.exploration / math.sqrt(stats.visits)
+        return min(self.max_score, max(self.min_score, mean_score * efficiency + exploration))
+
+    def record_evaluation(self, idea, combined_score: float):
+        self._charge(idea, calls=1, score=combined_score)
+        origin = self.origins.pop(idea.idea_id, None)
+        if origin is not None:
+            action, parent_score, calls = origin
+            self.action_pulls[action] += 1
+            # Calls spent producing and evaluating this result
+            self.action_rewards[action] += (combined_score - parent_score) / (calls + 1)
+
+    def record_action(self, idea, combined_score: float, action: str, results: List):
+        self._charge(idea, calls=1)
+        for result in results:
+            self.origins[result.idea_id] = (action, combined_score, 1 / len(results))
+
+    def _charge(self, idea, calls: int, score: float = None):
+        self.total_calls += calls
+        if score is not None:
+            self.total_visits += 1
+        for idea_id in idea.lineage_ids():
+            stats = self.lineages.get(idea_id)
+            if stats is None:
+                stats = self.lineages[idea_id] = LineageStats()
+            stats.calls += calls
+            if score is not None:
+                stats.visits += 1
+                stats.score_sum += score
+
+
+SCHEDULER_POLICIES = {
+    "fixed_penalty": FixedPenaltyPolicy,
+    "ucb": UCBPolicy,
+}
+
+
+def make_scheduler_policy(name: str, **kwargs) -> SchedulerPolicy:
+    if name not in SCHEDULER_POLICIES:
+        raise ValueError(f"Unknown scheduler policy: {name}")
+    return SCHEDULER_POLICIES[name](**kwargs)
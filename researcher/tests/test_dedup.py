@@ -0,0 +1,71 @@
+import numpy as np
+
+from dedup import DedupIndex
+
+# Stand-ins for embeddings API vectors: the paraphrase sits at cosine ~0.96 to its
+# original, the same-template idea about something else at ~0.82 to its template
+ORIGINAL = "Weekly meal kits delivered to busy parents"
+PARAPHRASE = "Home-delivered recipe boxes for time-starved families"
+TEMPLATE = "An AI tool that helps small restaurants manage inventory"
+TEMPLATE_DISTINCT = "An AI tool that helps small restaurants manage hiring"
+EMBEDDINGS = {
+    ORIGINAL: [0.9, 0.1, 0.0, 0.1],
+    PARAPHRASE: [0.8, 0.3, 0.1, 0.2],
+    TEMPLATE: [0.1, 0.9, 0.3, 0.0],
+    TEMPLATE_DISTINCT: [0.2, 0.9, -0.2, 0.3],
+}
+
+
+def admit(index, text):
+    return index.admit(text, EMBEDDINGS[text])
+
+
+def test_admits_first_idea():
+    index = DedupIndex()
+    assert admit(index, ORIGINAL) == (True, None, 0.0)
+    assert len(index) == 1
+
+
+def test_rejects_paraphrase_and_reports_match():
+    index = DedupIndex()
+    admit(index, ORIGINAL)
+    admitted, match, similarity = admit(index, PARAPHRASE)
+    assert not admitted
+    assert match == ORIGINAL
+    assert similarity >= index.threshold
+    assert index.rejected == 1
+    assert len(index) == 1
+
+
+def test_admits_same_template_distinct_idea():
+    index = DedupIndex()
+    admit(index, TEMPLATE)
+    admitted, match, similarity = admit(index, TEMPLATE_DISTINCT)
+    assert admitted
+    assert match == TEMPLATE
+    assert similarity < index.threshold
+    assert index.rejected == 0
+
+
+def test_exact_duplicate_is_rejected_regardless_of_scale():
+    index = DedupIndex()
+    index.admit("a", [1.0, 2.0, 3.0])
+    assert index.admit("b", [2.0, 4.0, 6.0])[0] is False
+
+
+def test_nearest_across_growth():
+    index = DedupIndex(threshold=0.99)
+    rng = np.random.RandomState(0)
+    vectors = rng.normal(size=(200, 16))
+    for i, vector in enumerate(vectors):
+        index.admit(str(i), vector)
+    assert len(index) == 200
+    match, similarity = index.nearest(vectors[137])
+    assert match == "137"
+    assert similarity > 0.999
+
+
+def test_zero_vector_does_not_match():
+    index = DedupIndex()
+    index.admit("a", [1.0, 0.0])
+    assert index.admit("empty", [0.0, 0.0]) == (True, "a", 0.0)
@@ -0,0 +1,104 @@
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from frontier import Frontier
+
+
+def make_idea(idea_id, depth=0):
+    return SimpleNamespace(idea_id=idea_id, depth=depth)
+
+
+def check_invariants(frontier):
+    heap = frontier.heap
+    for position in range(1, len(heap)):
+        assert heap[(position - 1) // 2][0] >= heap[position][0]
+    assert frontier.index == {entry[2].idea_id: position for position, entry in enumerate(heap)}
+    assert +frontier.depth_counts == Counter(entry[2].depth for entry in heap)
+
+
+def test_pops_best_first_and_older_ideas_win_ties():
+    frontier = Frontier()
+    for idea_id, priority in [(0, 2.0), (1, 4.5), (2, 3.0), (3, 4.5), (4, 1.0)]:
+        frontier.push(make_idea(idea_id), priority)
+    popped = [frontier.pop() for _ in range(len(frontier))]
+    assert [(priority, idea.idea_id) for priority, idea in popped] == [(4.5, 1), (4.5, 3), (3.0, 2), (2.0, 0), (1.0, 4)]
+    with pytest.raises(IndexError):
+        frontier.pop()
+
+
+def test_push_of_a_queued_idea_updates_it():
+    frontier = Frontier()
+    idea = make_idea(0)
+    frontier.push(idea, 1.0)
+    frontier.push(make_idea(1), 2.0)
+    frontier.push(idea, 3.0)
+    assert len(frontier) == 2
+    assert frontier.peek() == (3.0, idea)
+
+
+def test_update_moves_ideas_both_ways():
+    frontier = Frontier()
+    ideas = [make_idea(i) for i in range(10)]
+    for idea in ideas:
+        frontier.push(idea, float(idea.idea_id))
+    assert frontier.update(ideas[0], 20.0)
+    assert frontier.update(ideas[9], -1.0)
+    check_invariants(frontier)
+    assert frontier.peek() == (20.0, ideas[0])
+    assert [idea.idea_id for _, idea in frontier.top(3)] == [0, 8, 7]
+    assert not frontier.update(make_idea(99), 1.0)
+
+
+def test_depth_bonus_favours_deeper_ideas():
+    frontier = Frontier(depth_bonus=1.0, depth_limit=2, requirement_expansion_depth=1)
+    frontier.push(make_idea(0, depth=0), 3.0)
+    frontier.push(make_idea(1, depth=2), 2.5)
+    assert frontier.pop()[1].idea_id == 1
+
+
+def test_prune_keeps_the_best_within_max_size():
+    frontier = Frontier(max_size=10, slack=0.5)
+    for idea_id in range(15):
+        frontier.push(make_idea(idea_id), float(idea_id))
+    assert len(frontier) == 15  # Within the slack
+    frontier.push(make_idea(15), 15.0)
+    assert len(frontier) == 10
+    assert frontier.evicted == 6
+    assert sorted(idea.idea_id for _, idea in frontier) == list(range(6, 16))
+    check_invariants(frontier)
+
+
+def test_prune_enforces_beam_width_per_depth():
+    frontier = Frontier(beam_width=3, slack=0.0)
+    for idea_id in range(5):
+        frontier.push(make_idea(idea_id, depth=1), float(idea_id))
+    frontier.push(make_idea(5, depth=0), 0.0)
+    depths = Counter(idea.depth for _, idea in frontier)
+    assert depths == {1: 3, 0: 1}
+    assert sorted(idea.idea_id for _, idea in frontier if idea.depth == 1) == [2, 3, 4]
+    check_invariants(frontier)
+
+
+def test_random_operations_keep_the_heap_consistent():
+    rng = random.Random(7)
+    frontier = Frontier(max_size=50, beam_width=20, slack=0.25)
+    ideas = {}
+    for step in range(2000):
+        roll = rng.random()
+        if roll < 0.5 or not frontier:
+            idea = make_idea(step, depth=rng.randint(0, 3))
+            ideas[idea.idea_id] = idea
+            frontier.push(idea, rng.uniform(1, 5))
+        elif roll < 0.7:
+            best_key = max(entry[0] for entry in frontier.heap)
+            assert frontier.sort_key(*frontier.pop()) == best_key
+        elif roll < 0.9:
+            idea_id = rng.choice(list(frontier.index))
+            assert frontier.update(ideas[idea_id], rng.uniform(1, 5))
+        else:
+            assert frontier.remove(rng.choice(list(frontier.index)))
+        check_invariants(frontier)
+        assert len(frontier) <= 50 * 1.25
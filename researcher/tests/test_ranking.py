@@ -0,0 +1,102 @@
+import asyncio
+import math
+import random
+
+import pytest
+
+from idea_researcher import parse_ranking
+from ranking import BinaryInsertionRanker, ListwiseRanker, RankingEngine, make_ranking_engine
+
+KEYS = [f"idea {value:02d}" for value in range(40)]
+
+
+def value(key):
+    return int(key.split()[1])
+
+
+async def compare(a, b):
+    # The judge prefers higher-numbered ideas
+    return 1.0 if value(a) > value(b) else 0.0
+
+
+def insert_all(ranker, keys):
+    async def run():
+        for key in keys:
+            await ranker.insert(key)
+    asyncio.run(run())
+
+
+def test_ranking_engine_requires_insert():
+    class Incomplete(RankingEngine):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(compare, {})
+
+
+def test_binary_insertion_orders_exactly():
+    keys = KEYS[:]
+    random.Random(3).shuffle(keys)
+    ranker = BinaryInsertionRanker(compare, {})
+    insert_all(ranker, keys)
+    assert ranker.ranking == sorted(KEYS, key=value, reverse=True)
+    assert ranker.confidence() == 1.0
+
+
+def test_binary_insertion_compares_log_n_times_per_insert():
+    keys = KEYS[:]
+    random.Random(4).shuffle(keys)
+    ranker = BinaryInsertionRanker(compare, {})
+    bound = 0
+    for size, key in enumerate(keys):
+        insert_all(ranker, [key])
+        bound += math.ceil(math.log2(size + 1)) if size else 0
+    assert ranker.call_count == ranker.comparison_count <= bound
+
+
+def test_insert_is_idempotent_and_remove_forgets_outcomes():
+    ranker = make_ranking_engine("binary_insertion", compare, {})
+    insert_all(ranker, ["idea 01", "idea 05", "idea 03", "idea 05"])
+    assert ranker.ranking == ["idea 05", "idea 03", "idea 01"]
+    ranker.remove("idea 03")
+    assert ranker.ranking == ["idea 05", "idea 01"]
+    assert not any("idea 03" in pair for pair in ranker.outcomes)
+
+
+async def rank_window(keys):
+    return sorted(keys, key=value, reverse=True)
+
+
+@pytest.mark.parametrize("window_size", [2, 3, 5, 8])
+def test_listwise_orders_exactly(window_size):
+    keys = KEYS[:]
+    random.Random(window_size).shuffle(keys)
+    ranker = ListwiseRanker(compare, {}, rank_window=rank_window, window_size=window_size)
+    insert_all(ranker, keys)
+    assert ranker.ranking == sorted(KEYS, key=value, reverse=True)
+
+
+def test_listwise_rank_tolerates_a_malformed_answer():
+    async def sloppy(keys):
+        # Repeats one key, invents another and leaves the rest out
+        return [keys[2], "idea 99", keys[2], keys[0]]
+
+    window = ["idea 01", "idea 02", "idea 03", "idea 04"]
+    ranker = ListwiseRanker(compare, dict.fromkeys(window, 1500), rank_window=sloppy, window_size=4)
+    order = asyncio.run(ranker._rank(window))
+    assert order == ["idea 03", "idea 01", "idea 02", "idea 04"]
+    assert "idea 99" not in ranker.ratings
+
+
+@pytest.mark.parametrize("text, order", [
+    ("2, 3, 1", [1, 2, 0]),
+    ("Idea 3 is the strongest, then idea 1, then idea 2.", [2, 0, 1]),
+    ("1\n1\n3\n3\n2", [0, 2, 1]),  # Repeats are skipped
+    ("7, 0, 2, 12", [1, 0, 2]),  # Out of range numbers are skipped
+    ("3", [2, 0, 1]),  # Missing ideas go last, in the order presented
+    ("I cannot rank these ideas.", [0, 1, 2]),
+    ("", [0, 1, 2]),
+    (None, [0, 1, 2]),
+])
+def test_parse_ranking_on_malformed_answers(text, order):
+    assert parse_ranking(text, 3) == order